@@ -1,6 +1,7 @@
 #creadorDeSuperTemadeOffice.py
+import sys
 from pathlib import Path
-from Scripts.cli import RunCommandLineInterface
+from Scripts.cli import RunCommandLineInterface, RunSubcommand
 
 INSTALL_THEME_IN_POWERPOINT = True
 
@@ -10,5 +11,8 @@ def RunApplication() -> Path:
 
 
 if __name__ == "__main__":
+    ExitCode = RunSubcommand(sys.argv[1:])
+    if ExitCode is not None:
+        sys.exit(ExitCode)
     GeneratedPath = RunApplication()
     print(f"Theme file created at: {GeneratedPath}")
@@ -2,28 +2,225 @@
 #
 # Basic utilities for extracting and creating .thmx archives.
 # A .thmx file is just a ZIP; these functions unpack it and rebuild it.
+# Part data is always streamed in fixed-size chunks, so large media files
+# (background images, video) never have to be held in memory as a whole.
+# When a shared PartStore is given, parts already compressed by an earlier
+# build are copied into the new archive as-is instead of being compressed again.
+# Stored data is decompressed and CRC-checked while it is copied; a damaged blob
+# is rolled back, dropped from the store and the part is compressed from source.
 
 
 from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, Optional
+import os
 import zipfile
+import zlib
 
+if TYPE_CHECKING:
+    from .part_store import PartStore, StoredPart
 
-def ExtractArchive(SourceArchive: Path, DestinationDirectory: Path) -> Path:
-    # Unzip the .thmx archive into the destination folder.
+# Size of the buffer used when streaming part data. This is the only buffer
+# held per copy, so it acts as the memory budget for the whole pipeline: peak
+# memory stays the same no matter how large the media is or how many variants
+# are copied, because parts are processed one at a time.
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+def CopyStream(Source: BinaryIO, Destination: BinaryIO, ChunkSize: int = DEFAULT_CHUNK_SIZE) -> int:
+    # Copy Source into Destination in ChunkSize pieces and return the byte count.
+    if ChunkSize <= 0:
+        raise ValueError("ChunkSize must be a positive number of bytes.")
+
+    CopiedBytes = 0
+    while True:
+        Chunk = Source.read(ChunkSize)
+        if not Chunk:
+            return CopiedBytes
+        Destination.write(Chunk)
+        CopiedBytes += len(Chunk)
+
+
+def _ResolveMemberPath(DestinationDirectory: Path, MemberName: str) -> Path:
+    # Map an archive member to a path inside DestinationDirectory, rejecting
+    # absolute names and ".." segments that would escape the folder.
+    NormalizedName = MemberName.replace("\\", "/")
+    Parts = [Part for Part in NormalizedName.split("/") if Part not in ("", ".")]
+    if NormalizedName.startswith("/") or ".." in Parts or (Parts and ":" in Parts[0]):
+        raise ValueError(f"Unsafe archive member path: {MemberName}")
+    return DestinationDirectory.joinpath(*Parts)
+
+
+# ZipFile internals used by _WriteStoredEntry. They were checked against
+# CPython 3.10, 3.11, 3.12 and 3.13 (tests/test_part_store.py). If an
+# interpreter lacks any of them (e.g. a different version bundled by
+# PyInstaller), the store is bypassed and parts are compressed normally.
+_ZIPFILE_WRITER_INTERNALS = ("_lock", "_writing", "_writecheck", "_didModify", "fp", "start_dir", "filelist", "NameToInfo")
+
+
+def _SupportsStoredEntries(Archive: zipfile.ZipFile) -> bool:
+    # Report whether stored deflate data can be written into this archive.
+    return all(hasattr(Archive, Name) for Name in _ZIPFILE_WRITER_INTERNALS) and hasattr(zipfile.ZipInfo, "FileHeader")
+
+
+class DeflateChecker:
+    # Decompresses a raw deflate stream piece by piece and tracks the CRC-32
+    # and size of the data, to validate stored parts without holding them in
+    # memory. Each decompression step produces at most ChunkSize bytes.
+
+    def __init__(self, ChunkSize: int = DEFAULT_CHUNK_SIZE) -> None:
+        self.ChunkSize = ChunkSize
+        self.CRC = 0
+        self.Size = 0
+        self._Decompressor = zlib.decompressobj(-15)
+
+    def _Account(self, Data: bytes) -> None:
+        self.CRC = zlib.crc32(Data, self.CRC)
+        self.Size += len(Data)
+
+    def Update(self, CompressedChunk: bytes) -> None:
+        # Raises zlib.error when the data is not a valid deflate stream.
+        Pending = CompressedChunk
+        while Pending:
+            self._Account(self._Decompressor.decompress(Pending, self.ChunkSize))
+            Pending = self._Decompressor.unconsumed_tail
+
+    def Matches(self, Crc: int, Size: int) -> bool:
+        # Finish the stream and compare it with the expected CRC and size.
+        self._Account(self._Decompressor.flush())
+        return self._Decompressor.eof and not self._Decompressor.unused_data and self.CRC == Crc and self.Size == Size
+
+
+def _WriteStoredEntry(
+    Archive: zipfile.ZipFile,
+    EntryInfo: zipfile.ZipInfo,
+    Part: "StoredPart",
+    BlobStream: BinaryIO,
+    ChunkSize: int = DEFAULT_CHUNK_SIZE,
+) -> bool:
+    # Append an entry whose deflate data is already available. zipfile has no
+    # public API for pre-compressed data, so this writes the local header and
+    # the raw bytes the same way ZipFile.open(..., "w") does once sizes are known,
+    # under the same lock and checks. The data is verified while it is copied;
+    # if it does not match Part, the entry is truncated away and False is returned.
+    EntryInfo.compress_type = zipfile.ZIP_DEFLATED
+    EntryInfo.CRC = Part.CRC
+    EntryInfo.file_size = Part.Size
+    EntryInfo.compress_size = Part.CompressedSize
+    RequiresZip64 = Part.Size > zipfile.ZIP64_LIMIT or Part.CompressedSize > zipfile.ZIP64_LIMIT
+
+    with Archive._lock:
+        if Archive._writing:
+            raise ValueError("Can't write to the ZIP file while there is another write handle open on it.")
+        Archive._writecheck(EntryInfo)
+        Archive.fp.seek(Archive.start_dir)
+        EntryInfo.header_offset = Archive.start_dir
+        Archive.fp.write(EntryInfo.FileHeader(RequiresZip64))
+
+        Checker = DeflateChecker(ChunkSize)
+        CopiedBytes = 0
+        try:
+            while True:
+                Chunk = BlobStream.read(ChunkSize)
+                if not Chunk:
+                    break
+                Archive.fp.write(Chunk)
+                CopiedBytes += len(Chunk)
+                Checker.Update(Chunk)
+            IsIntact = CopiedBytes == Part.CompressedSize and Checker.Matches(Part.CRC, Part.Size)
+        except zlib.error:
+            IsIntact = False
+
+        if not IsIntact:
+            Archive.fp.seek(EntryInfo.header_offset)
+            Archive.fp.truncate()
+            return False
+
+        Archive._didModify = True
+        Archive.filelist.append(EntryInfo)
+        Archive.NameToInfo[EntryInfo.filename] = EntryInfo
+        Archive.start_dir = Archive.fp.tell()
+    return True
+
+
+def _WriteFromStore(
+    Archive: zipfile.ZipFile,
+    EntryInfo: zipfile.ZipInfo,
+    SharedStore: "PartStore",
+    SourcePath: Path,
+    ChunkSize: int = DEFAULT_CHUNK_SIZE,
+) -> bool:
+    # Write one part with its deflate data from the store. When the blob is
+    # damaged, or was deleted meanwhile by another process trimming the same
+    # store, it is dropped and False is returned so the caller compresses the
+    # part from its source like a build without a store.
+    Part = SharedStore.Put(SourcePath, ChunkSize)
+    try:
+        BlobStream = SharedStore.OpenBlob(Part)
+    except FileNotFoundError:
+        IsWritten = False
+    else:
+        with BlobStream:
+            IsWritten = _WriteStoredEntry(Archive, EntryInfo, Part, BlobStream, ChunkSize)
+    if not IsWritten:
+        SharedStore.Discard(Part)
+    return IsWritten
+
+
+def ExtractArchive(SourceArchive: Path, DestinationDirectory: Path, ChunkSize: int = DEFAULT_CHUNK_SIZE) -> Path:
+    # Unzip the .thmx archive into the destination folder, one part at a time.
     DestinationDirectory.mkdir(parents=True, exist_ok=True)
     with zipfile.ZipFile(SourceArchive, "r") as Archive:
-        Archive.extractall(DestinationDirectory)
+        for MemberInfo in Archive.infolist():
+            MemberPath = _ResolveMemberPath(DestinationDirectory, MemberInfo.filename)
+            if MemberInfo.is_dir():
+                MemberPath.mkdir(parents=True, exist_ok=True)
+                continue
+            MemberPath.parent.mkdir(parents=True, exist_ok=True)
+            with Archive.open(MemberInfo, "r") as SourceStream, open(MemberPath, "wb") as DestinationStream:
+                CopyStream(SourceStream, DestinationStream, ChunkSize)
     return DestinationDirectory
 
 
-def CreateArchiveFromDirectory(SourceDirectory: Path, OutputArchive: Path) -> Path:
+def CreateArchiveFromDirectory(
+    SourceDirectory: Path,
+    OutputArchive: Path,
+    ChunkSize: int = DEFAULT_CHUNK_SIZE,
+    SharedStore: Optional["PartStore"] = None,
+) -> Path:
     # Rebuild a .thmx archive by zipping all files under SourceDirectory.
+    # With SharedStore, each part is looked up by content and its stored
+    # deflate data is reused; new parts are compressed once into the store.
+    # The archive is written to a temporary file next to the output and renamed
+    # into place at the end, so an interrupted build never leaves a partial
+    # .thmx that looks finished.
     OutputArchive.parent.mkdir(parents=True, exist_ok=True)
-    with zipfile.ZipFile(OutputArchive, "w", zipfile.ZIP_DEFLATED) as Archive:
-        for PathItem in SourceDirectory.rglob("*"):
-            if not PathItem.is_file():
-                continue
-            RelativePath = PathItem.relative_to(SourceDirectory)
-            NormalizedPath = str(RelativePath).replace("\\", "/")
-            Archive.write(PathItem, arcname=NormalizedPath)
+    TemporaryArchive = OutputArchive.with_name(f".{OutputArchive.name}.partial")
+    try:
+        with zipfile.ZipFile(TemporaryArchive, "w", zipfile.ZIP_DEFLATED) as Archive:
+            UsesSharedStore = SharedStore is not None and _SupportsStoredEntries(Archive)
+            for PathItem in SourceDirectory.rglob("*"):
+                if not PathItem.is_file():
+                    continue
+                RelativePath = PathItem.relative_to(SourceDirectory)
+                NormalizedPath = str(RelativePath).replace("\\", "/")
+                EntryInfo = zipfile.ZipInfo.from_file(PathItem, arcname=NormalizedPath)
+                EntryInfo.compress_type = zipfile.ZIP_DEFLATED
+                if UsesSharedStore and _WriteFromStore(Archive, EntryInfo, SharedStore, PathItem, ChunkSize):
+                    continue
+                with open(PathItem, "rb") as SourceStream, Archive.open(EntryInfo, "w") as EntryStream:
+                    CopyStream(SourceStream, EntryStream, ChunkSize)
+        os.replace(TemporaryArchive, OutputArchive)
+    except BaseException:
+        TemporaryArchive.unlink(missing_ok=True)
+        # Still record the parts stored so far, but never let a failure to
+        # save the index hide the error that stopped the build.
+        if SharedStore is not None:
+            try:
+                SharedStore.Save()
+            except OSError:
+                pass
+        raise
+
+    if SharedStore is not None:
+        SharedStore.Save()
     return OutputArchive
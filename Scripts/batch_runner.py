@@ -0,0 +1,191 @@
+# batch_runner.py
+#
+# Runs many super theme builds from a job file and records the outcome of each
+# one in a journal. The journal stores, per output, the hash of every input,
+# the hash of the written output and the job status. When the batch is run
+# again, jobs whose inputs and output are unchanged are skipped, so a restart
+# after a crash or a locked file only rebuilds the failed or missing jobs.
+#
+# Job file format (paths are relative to the job file):
+# {"jobs": [{"base": "Tema A.thmx", "variants": ["Tema B.thmx"],
+#            "variant_names": ["B"], "variant_table": "palettes.json",
+#            "output": "out/Super A.thmx"}]}
+
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Sequence
+import hashlib
+import json
+import os
+
+from .archive_manager import DEFAULT_CHUNK_SIZE
+from .part_store import PartStore
+from .super_theme_builder import BuildSuperTheme
+from .variant_generator import LoadVariantTable
+
+# Version of the journal layout, stored in the file for future migrations
+JOURNAL_VERSION = 1
+
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+@dataclass
+class BatchJob:
+    # One BuildSuperTheme call described by the job file.
+    BaseTheme: Path
+    Output: Path
+    Variants: list[Path] = field(default_factory=list)
+    VariantNames: list[str] = field(default_factory=list)
+    VariantTable: Optional[Path] = None
+
+    @property
+    def Key(self) -> str:
+        # Jobs are identified in the journal by their output path.
+        return str(self.Output.resolve())
+
+    def InputPaths(self) -> list[Path]:
+        InputPaths = [self.BaseTheme, *self.Variants]
+        if self.VariantTable is not None:
+            InputPaths.append(self.VariantTable)
+        return InputPaths
+
+
+@dataclass
+class BatchSummary:
+    # Job counts of one batch run.
+    Built: int = 0
+    Skipped: int = 0
+    Failed: int = 0
+    Errors: dict[str, str] = field(default_factory=dict)
+
+
+def LoadBatchJobs(JobFilePath: Path) -> list[BatchJob]:
+    # Read the job file and resolve its paths relative to the file itself.
+    with open(JobFilePath, "r", encoding="utf-8") as JobFile:
+        JobData = json.load(JobFile)
+
+    JobDirectory = JobFilePath.parent
+    Jobs: list[BatchJob] = []
+    JobKeys: set[str] = set()
+    for Row in JobData.get("jobs", []):
+        if "base" not in Row or "output" not in Row:
+            raise ValueError("Every batch job needs a 'base' and an 'output'.")
+        # Match BuildSuperTheme, which adds .thmx to outputs without a suffix.
+        OutputPath = JobDirectory / Row["output"]
+        if not OutputPath.suffix:
+            OutputPath = OutputPath.with_suffix(".thmx")
+        Job = BatchJob(
+            BaseTheme=JobDirectory / Row["base"],
+            Output=OutputPath,
+            Variants=[JobDirectory / Variant for Variant in Row.get("variants", [])],
+            VariantNames=list(Row.get("variant_names", [])),
+            VariantTable=JobDirectory / Row["variant_table"] if Row.get("variant_table") else None,
+        )
+        # The journal keys jobs by output, so two jobs cannot share one.
+        if Job.Key in JobKeys:
+            raise ValueError(f"Several batch jobs write the same output: {Row['output']}")
+        JobKeys.add(Job.Key)
+        Jobs.append(Job)
+    return Jobs
+
+
+def HashFile(FilePath: Path, ChunkSize: int = DEFAULT_CHUNK_SIZE) -> str:
+    # Return the SHA-256 of a file, read in ChunkSize pieces.
+    Digest = hashlib.sha256()
+    with open(FilePath, "rb") as SourceStream:
+        while True:
+            Chunk = SourceStream.read(ChunkSize)
+            if not Chunk:
+                return Digest.hexdigest()
+            Digest.update(Chunk)
+
+
+def _LoadJournal(JournalPath: Path) -> dict:
+    # Read the journal, or start an empty one if it is missing or unreadable.
+    if not JournalPath.exists():
+        return {"version": JOURNAL_VERSION, "jobs": {}}
+    try:
+        with open(JournalPath, "r", encoding="utf-8") as JournalFile:
+            Journal = json.load(JournalFile)
+    except (OSError, ValueError):
+        return {"version": JOURNAL_VERSION, "jobs": {}}
+    if Journal.get("version") != JOURNAL_VERSION:
+        return {"version": JOURNAL_VERSION, "jobs": {}}
+    return Journal
+
+
+def _SaveJournal(JournalPath: Path, Journal: dict) -> None:
+    # Write the journal atomically: a crash keeps the previous version intact.
+    JournalPath.parent.mkdir(parents=True, exist_ok=True)
+    TemporaryPath = JournalPath.with_name(f".{JournalPath.name}.partial")
+    with open(TemporaryPath, "w", encoding="utf-8") as JournalFile:
+        json.dump(Journal, JournalFile, indent=2, sort_keys=True)
+    os.replace(TemporaryPath, JournalPath)
+
+
+def _IsUpToDate(Job: BatchJob, Record: Optional[dict], InputHashes: dict[str, str], ChunkSize: int) -> bool:
+    # A job can be skipped when it finished before with the same inputs and
+    # options, and its output is still the file that was written then.
+    if Record is None or Record.get("status") != STATUS_DONE:
+        return False
+    if Record.get("inputs") != InputHashes or Record.get("variant_names") != Job.VariantNames:
+        return False
+    if not Job.Output.exists():
+        return False
+    return HashFile(Job.Output, ChunkSize) == Record.get("output")
+
+
+def RunBatch(
+    Jobs: Sequence[BatchJob],
+    JournalPath: Path,
+    ChunkSize: int = DEFAULT_CHUNK_SIZE,
+    SharedStore: Optional[PartStore] = None,
+) -> BatchSummary:
+    # Build every job that is not up to date, recording each result in the
+    # journal as soon as it is known. A failing job does not stop the batch.
+    # With SharedStore, parts repeated across outputs are compressed only once.
+    Journal = _LoadJournal(JournalPath)
+    Summary = BatchSummary()
+    HashCache: dict[Path, str] = {}
+
+    for Job in Jobs:
+        Record: dict = {"variant_names": Job.VariantNames, "output": None}
+        try:
+            # Inputs shared by many jobs (the base theme) are hashed once per run.
+            InputHashes = {}
+            for InputPath in Job.InputPaths():
+                ResolvedPath = InputPath.resolve()
+                if ResolvedPath not in HashCache:
+                    HashCache[ResolvedPath] = HashFile(ResolvedPath, ChunkSize)
+                InputHashes[str(ResolvedPath)] = HashCache[ResolvedPath]
+            Record["inputs"] = InputHashes
+
+            if _IsUpToDate(Job, Journal["jobs"].get(Job.Key), InputHashes, ChunkSize):
+                Summary.Skipped += 1
+                continue
+
+            GeneratedVariants = LoadVariantTable(Job.VariantTable) if Job.VariantTable is not None else []
+            ResultPath = BuildSuperTheme(
+                Job.BaseTheme,
+                Job.Variants,
+                Job.Output,
+                Job.VariantNames,
+                ChunkSize=ChunkSize,
+                GeneratedVariants=GeneratedVariants,
+                SharedStore=SharedStore,
+            )
+            Record["output"] = HashFile(ResultPath, ChunkSize)
+            Record["status"] = STATUS_DONE
+            Summary.Built += 1
+        except Exception as Error:
+            Record["status"] = STATUS_FAILED
+            Record["error"] = f"{type(Error).__name__}: {Error}"
+            Summary.Failed += 1
+            Summary.Errors[Job.Key] = Record["error"]
+
+        Journal["jobs"][Job.Key] = Record
+        _SaveJournal(JournalPath, Journal)
+
+    return Summary
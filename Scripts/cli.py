@@ -12,22 +12,44 @@
 # Once the input paths are obtained, the module delegates the actual creation
 # of the super theme to `BuildSuperTheme`, ensuring a clean separation between
 # user interaction and processing logic.
+#
+# Subcommands (`batch`, `inspect`, `verify-store`) are dispatched by RunSubcommand before the regular
+# argument parsing, so the legacy positional interface keeps working.
 
 # Note:
 # The modules `argparse` and its class `ArgumentParser` are part of Python's
 # standard library. Python provides them # to simplify the reading, interpretation, and validation of command-line# arguments.
 
 import argparse
+import dataclasses
+import json
 import os
 import shutil
 import sys
 from pathlib import Path
 from typing import Iterable, Sequence
 
+from .archive_manager import DEFAULT_CHUNK_SIZE
+from .batch_runner import LoadBatchJobs, RunBatch
+from .part_store import DEFAULT_MAX_BYTES, PartStore
 from .super_theme_builder import BuildSuperTheme
+from .super_theme_inspector import CollectArchives, FormatReportTable, InspectArchives
+from .variant_generator import LoadVariantTable
 from .tkinter_selector import PromptThemeSelection
 
 
+def _PositiveInteger(Value: str) -> int:
+    # argparse type for sizes and counts that must be at least 1. A chunk size
+    # of 0 or less would fail mid-build or read whole files into memory.
+    try:
+        Number = int(Value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid integer value: {Value!r}")
+    if Number <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive integer: {Value!r}")
+    return Number
+
+
 def ParseArguments() -> argparse.Namespace:
     Parser = argparse.ArgumentParser(description="Create a super theme with a primary theme and multiple variants.")
     Parser.add_argument("BaseTheme", nargs="?", help="Path to the base .thmx theme archive")
@@ -36,9 +58,23 @@ def ParseArguments() -> argparse.Namespace:
     Parser.add_argument("--variant", dest="Variants", action="append", default=[], help="Path to a variant .thmx theme archive. Provide multiple times for several variants.")
     Parser.add_argument("--variant-name", dest="VariantNames", action="append", default=[], help="Folder/display name for each variant, matching the order of --variant arguments.")
     Parser.add_argument("--output", dest="OutputPathFlag", help="Destination path for the combined super theme archive")
+    Parser.add_argument("--variant-table", dest="VariantTable", help="JSON table of palettes and fonts; each row generates a variant from the base theme.")
+    Parser.add_argument("--chunk-size", dest="ChunkSize", type=_PositiveInteger, default=DEFAULT_CHUNK_SIZE, help="Buffer size in bytes used to stream theme parts (bounds memory use for large media).")
+    _AddPartStoreArguments(Parser)
     return Parser.parse_args()
 
 
+def _AddPartStoreArguments(Parser: argparse.ArgumentParser) -> None:
+    Parser.add_argument("--part-store", dest="PartStoreDirectory", help="Folder of a shared store of compressed parts, reused across builds.")
+    Parser.add_argument("--part-store-max-bytes", dest="PartStoreMaxBytes", type=int, default=DEFAULT_MAX_BYTES, help="Size limit of the part store; least recently used parts are evicted.")
+
+
+def _OpenPartStore(Arguments: argparse.Namespace) -> PartStore | None:
+    if not Arguments.PartStoreDirectory:
+        return None
+    return PartStore(Path(Arguments.PartStoreDirectory), MaxBytes=Arguments.PartStoreMaxBytes)
+
+
 def _NormalizeVariantNames(VariantPaths: Sequence[str], ProvidedNames: Iterable[str]) -> list[str]:
     NormalizedNames = list(ProvidedNames)
     while len(NormalizedNames) < len(VariantPaths):
@@ -59,7 +95,16 @@ def BuildSuperThemeFromArguments(Arguments: argparse.Namespace) -> Path:
         raise ValueError("An output path must be provided when running via the CLI.")
 
     OutputPath = Path(OutputPathValue)
-    return BuildSuperTheme(BaseThemePath, [Path(PathValue) for PathValue in VariantPaths], OutputPath, VariantNames)
+    GeneratedVariants = LoadVariantTable(Path(Arguments.VariantTable)) if Arguments.VariantTable else []
+    return BuildSuperTheme(
+        BaseThemePath,
+        [Path(PathValue) for PathValue in VariantPaths],
+        OutputPath,
+        VariantNames,
+        ChunkSize=Arguments.ChunkSize,
+        GeneratedVariants=GeneratedVariants,
+        SharedStore=_OpenPartStore(Arguments),
+    )
 
 
 def _ResolveTemplatesDirectory() -> Path:
@@ -85,6 +130,92 @@ def CopyThemeToTemplates(ThemePath: Path) -> Path:
     return Destination
 
 
+def ParseBatchArguments(ArgumentList: Sequence[str]) -> argparse.Namespace:
+    Parser = argparse.ArgumentParser(prog="batch", description="Build every super theme listed in a JSON job file, resuming from its journal.")
+    Parser.add_argument("JobFile", help="Path to the JSON job file")
+    Parser.add_argument("--journal", dest="JournalPath", help="Journal file (default: <JobFile>.journal.json)")
+    Parser.add_argument("--chunk-size", dest="ChunkSize", type=_PositiveInteger, default=DEFAULT_CHUNK_SIZE, help="Buffer size in bytes used to stream theme parts.")
+    _AddPartStoreArguments(Parser)
+    return Parser.parse_args(ArgumentList)
+
+
+def RunBatchCommand(ArgumentList: Sequence[str]) -> int:
+    ParsedArguments = ParseBatchArguments(ArgumentList)
+    JobFilePath = Path(ParsedArguments.JobFile)
+    JournalPath = Path(ParsedArguments.JournalPath) if ParsedArguments.JournalPath else JobFilePath.with_name(f"{JobFilePath.name}.journal.json")
+
+    Summary = RunBatch(
+        LoadBatchJobs(JobFilePath),
+        JournalPath,
+        ChunkSize=ParsedArguments.ChunkSize,
+        SharedStore=_OpenPartStore(ParsedArguments),
+    )
+    for JobKey, ErrorMessage in Summary.Errors.items():
+        print(f"Error en {JobKey}: {ErrorMessage}", file=sys.stderr)
+    print(f"Construidos: {Summary.Built}, omitidos: {Summary.Skipped}, fallidos: {Summary.Failed} (journal: {JournalPath})")
+    return 1 if Summary.Failed else 0
+
+
+def ParseInspectArguments(ArgumentList: Sequence[str]) -> argparse.Namespace:
+    Parser = argparse.ArgumentParser(prog="inspect", description="List the variants, identifiers, part counts and sizes of super theme archives.")
+    Parser.add_argument("Paths", nargs="+", help=".thmx archives or folders containing them")
+    Parser.add_argument("--json", dest="AsJson", action="store_true", help="Print the report as JSON instead of a table")
+    Parser.add_argument("--recursive", dest="Recursive", action="store_true", help="Also search subfolders for .thmx archives")
+    Parser.add_argument("--workers", dest="Workers", type=_PositiveInteger, default=None, help="Number of archives inspected in parallel")
+    return Parser.parse_args(ArgumentList)
+
+
+def RunInspectCommand(ArgumentList: Sequence[str]) -> int:
+    ParsedArguments = ParseInspectArguments(ArgumentList)
+    ArchivePaths = CollectArchives([Path(PathValue) for PathValue in ParsedArguments.Paths], ParsedArguments.Recursive)
+    Reports = InspectArchives(ArchivePaths, MaxWorkers=ParsedArguments.Workers)
+
+    if ParsedArguments.AsJson:
+        print(json.dumps([dataclasses.asdict(Report) for Report in Reports], indent=2, ensure_ascii=False))
+    else:
+        print(FormatReportTable(Reports))
+    return 1 if any(Report.Error is not None for Report in Reports) else 0
+
+
+def ParseVerifyStoreArguments(ArgumentList: Sequence[str]) -> argparse.Namespace:
+    Parser = argparse.ArgumentParser(prog="verify-store", description="Check every part of a shared part store and drop the damaged ones.")
+    Parser.add_argument("PartStoreDirectory", help="Folder of the shared part store")
+    Parser.add_argument("--chunk-size", dest="ChunkSize", type=_PositiveInteger, default=DEFAULT_CHUNK_SIZE, help="Buffer size in bytes used to read stored parts.")
+    return Parser.parse_args(ArgumentList)
+
+
+def RunVerifyStoreCommand(ArgumentList: Sequence[str]) -> int:
+    ParsedArguments = ParseVerifyStoreArguments(ArgumentList)
+    StoreDirectory = Path(ParsedArguments.PartStoreDirectory)
+    if not StoreDirectory.is_dir():
+        print(f"No existe el almacén de partes: {StoreDirectory}", file=sys.stderr)
+        return 1
+
+    # No size limit here: verifying must not evict parts.
+    SharedStore = PartStore(StoreDirectory, MaxBytes=None)
+    DroppedDigests = SharedStore.VerifyAll(ParsedArguments.ChunkSize)
+    SharedStore.Save()
+    for Digest in DroppedDigests:
+        print(f"Parte dañada eliminada: {Digest}", file=sys.stderr)
+    print(f"Partes correctas: {SharedStore.PartCount()}, dañadas: {len(DroppedDigests)}")
+    return 1 if DroppedDigests else 0
+
+
+SUBCOMMANDS = {
+    "batch": RunBatchCommand,
+    "inspect": RunInspectCommand,
+    "verify-store": RunVerifyStoreCommand,
+}
+
+
+def RunSubcommand(ArgumentList: Sequence[str]) -> int | None:
+    # Run a subcommand if the first argument names one and return its exit
+    # code; return None to fall back to the regular interface.
+    if not ArgumentList or ArgumentList[0] not in SUBCOMMANDS:
+        return None
+    return SUBCOMMANDS[ArgumentList[0]](ArgumentList[1:])
+
+
 def RunTkinterInterface(InstallTheme: bool = True) -> Path:
     ThemesDirectory = Path(sys.argv[0]).resolve().parent
     Selection = PromptThemeSelection(ThemesDirectory)
@@ -102,7 +233,7 @@ def RunCommandLineInterface(InstallTheme: bool = True) -> Path:
     OutputCandidate = ParsedArguments.OutputPathFlag or ParsedArguments.OutputPath
     VariantCandidates = ParsedArguments.Variants or ([] if ParsedArguments.VariantTheme is None else [ParsedArguments.VariantTheme])
 
-    if ParsedArguments.BaseTheme and OutputCandidate and VariantCandidates:
+    if ParsedArguments.BaseTheme and OutputCandidate and (VariantCandidates or ParsedArguments.VariantTable):
         ResultPath = BuildSuperThemeFromArguments(ParsedArguments)
         if InstallTheme:
             CopyThemeToTemplates(ResultPath)
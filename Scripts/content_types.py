@@ -7,21 +7,20 @@
 # when required.
 
 from pathlib import Path
-import xml.etree.ElementTree as ElementTree
+
+from . import xml_backend as XmlBackend
 
 # Namespace used in the [Content_Types].xml document
 CONTENT_TYPES_NAMESPACE = "http://schemas.openxmlformats.org/package/2006/content-types"
 
+# Prefixes used when writing [Content_Types].xml
+NAMESPACES = {"": CONTENT_TYPES_NAMESPACE}
+
 # Default content type required for EMF images if not already present
 DEFAULT_EMF_CONTENT_TYPE = "image/x-emf"
 
 
-def _RegisterNamespace() -> None:
-    # Ensure ElementTree writes the content-types XML with the correct namespace.
-    ElementTree.register_namespace("", CONTENT_TYPES_NAMESPACE)
-
-
-def _FindExistingDefault(TypeRoot: ElementTree.Element, Extension: str) -> bool:
+def _FindExistingDefault(TypeRoot: XmlBackend.XmlElement, Extension: str) -> bool:
     # Check if a <Default> entry already exists for the given file extension.
     for DefaultElement in TypeRoot.findall(f"{{{CONTENT_TYPES_NAMESPACE}}}Default"):
         if DefaultElement.get("Extension") == Extension:
@@ -29,20 +28,12 @@ def _FindExistingDefault(TypeRoot: ElementTree.Element, Extension: str) -> bool:
     return False
 
 
-def _FindExistingOverride(TypeRoot: ElementTree.Element, PartName: str) -> bool:
-    # Check if a <Override> entry already exists for the given PartName.
-    for OverrideElement in TypeRoot.findall(f"{{{CONTENT_TYPES_NAMESPACE}}}Override"):
-        if OverrideElement.get("PartName") == PartName:
-            return True
-    return False
-
-
-def _AppendDefault(TypeRoot: ElementTree.Element, Extension: str, ContentType: str) -> None:
+def _AppendDefault(TypeRoot: XmlBackend.XmlElement, Extension: str, ContentType: str) -> None:
     # Add a <Default> entry only if it does not already exist.
     if _FindExistingDefault(TypeRoot, Extension):
         return
 
-    DefaultElement = ElementTree.Element(f"{{{CONTENT_TYPES_NAMESPACE}}}Default")
+    DefaultElement = XmlBackend.CreateElement(f"{{{CONTENT_TYPES_NAMESPACE}}}Default", NAMESPACES)
     DefaultElement.set("Extension", Extension)
     DefaultElement.set("ContentType", ContentType)
 
@@ -60,59 +51,62 @@ def _AppendDefault(TypeRoot: ElementTree.Element, Extension: str, ContentType: s
     TypeRoot.insert(InsertIndex, DefaultElement)
 
 
-def _AppendOverride(TypeRoot: ElementTree.Element, PartName: str, ContentType: str) -> None:
-    # Add a <Override> entry only if it does not already exist.
-    if _FindExistingOverride(TypeRoot, PartName):
+def _AppendOverride(TypeRoot: XmlBackend.XmlElement, ExistingPartNames: set[str], PartName: str, ContentType: str) -> None:
+    # Add a <Override> entry only if it does not already exist. ExistingPartNames
+    # holds the PartName of every <Override> so the check needs no scan.
+    if PartName in ExistingPartNames:
         return
 
-    OverrideElement = ElementTree.Element(f"{{{CONTENT_TYPES_NAMESPACE}}}Override")
+    OverrideElement = XmlBackend.AddSubElement(TypeRoot, f"{{{CONTENT_TYPES_NAMESPACE}}}Override")
     OverrideElement.set("PartName", PartName)
     OverrideElement.set("ContentType", ContentType)
-    TypeRoot.append(OverrideElement)
+    ExistingPartNames.add(PartName)
 
 
 def UpdateContentTypesForVariants(ContentTypesPath: Path, VariantNames: list[str]) -> None:
     # Main function: ensures all necessary variant parts are registered.
-    _RegisterNamespace()
-
-    DocumentTree = ElementTree.parse(ContentTypesPath)
-    TypeRoot = DocumentTree.getroot()
+    TypeRoot = XmlBackend.ParseFile(ContentTypesPath)
 
     # Add missing EMF default if required.
     _AppendDefault(TypeRoot, "emf", DEFAULT_EMF_CONTENT_TYPE)
 
     OverrideTag = f"{{{CONTENT_TYPES_NAMESPACE}}}Override"
 
+    # Clean obsolete overrides for theme/theme1.xml inside the variants (they are
+    # registered again below) and index the remaining part names, in one pass.
+    ObsoletePrefixes = tuple(f"/themeVariants/{VariantName}/theme/theme/theme" for VariantName in VariantNames)
+    ExistingPartNames: set[str] = set()
+    for OverrideElement in list(TypeRoot.findall(OverrideTag)):
+        PartName = OverrideElement.get("PartName")
+        if PartName is None:
+            continue
+        if ObsoletePrefixes and PartName.startswith(ObsoletePrefixes):
+            TypeRoot.remove(OverrideElement)
+            continue
+        ExistingPartNames.add(PartName)
+
     for VariantName in VariantNames:
         VariantPrefix = f"/themeVariants/{VariantName}/theme"
 
-        # Clean obsolete overrides for theme/theme1.xml inside the variant.
-        for OverrideElement in list(TypeRoot.findall(OverrideTag)):
-            PartName = OverrideElement.get("PartName")
-            if PartName is None:
-                continue
-            if PartName.startswith(f"{VariantPrefix}/theme/theme"):
-                TypeRoot.remove(OverrideElement)
-
         # Register all expected variant parts.
-        _AppendOverride(TypeRoot, f"{VariantPrefix}/presentation.xml",
+        _AppendOverride(TypeRoot, ExistingPartNames, f"{VariantPrefix}/presentation.xml",
                         "application/vnd.openxmlformats-officedocument.presentationml.presentation.main+xml")
 
         for Index in range(1, 10):
-            _AppendOverride(TypeRoot,
+            _AppendOverride(TypeRoot, ExistingPartNames,
                             f"{VariantPrefix}/slideLayouts/slideLayout{Index}.xml",
                             "application/vnd.openxmlformats-officedocument.presentationml.slideLayout+xml")
 
-        _AppendOverride(TypeRoot, f"{VariantPrefix}/slideMasters/slideMaster1.xml",
+        _AppendOverride(TypeRoot, ExistingPartNames, f"{VariantPrefix}/slideMasters/slideMaster1.xml",
                         "application/vnd.openxmlformats-officedocument.presentationml.slideMaster+xml")
 
-        _AppendOverride(TypeRoot, f"{VariantPrefix}/theme/theme1.xml",
+        _AppendOverride(TypeRoot, ExistingPartNames, f"{VariantPrefix}/theme/theme1.xml",
                         "application/vnd.openxmlformats-officedocument.theme+xml")
 
-        _AppendOverride(TypeRoot, f"{VariantPrefix}/theme/themeManager.xml",
+        _AppendOverride(TypeRoot, ExistingPartNames, f"{VariantPrefix}/theme/themeManager.xml",
                         "application/vnd.openxmlformats-officedocument.themeManager+xml")
 
-    _AppendOverride(TypeRoot, "/themeVariants/themeVariantManager.xml",
+    _AppendOverride(TypeRoot, ExistingPartNames, "/themeVariants/themeVariantManager.xml",
                     "application/vnd.ms-office.themeVariantManager+xml")
 
-    DocumentTree.write(ContentTypesPath, encoding="utf-8", xml_declaration=True)
+    XmlBackend.WriteDocument(TypeRoot, ContentTypesPath, NAMESPACES)
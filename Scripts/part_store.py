@@ -0,0 +1,239 @@
+# part_store.py
+#
+# Optional local content-addressable store for compressed theme parts. Slide
+# layouts, masters and media repeat across many .thmx outputs; the store keeps
+# each distinct part once, as the raw deflate stream a ZIP entry needs, along
+# with its CRC-32 and sizes. archive_manager can then write those bytes
+# straight into new archives instead of compressing the same part again.
+#
+# Layout of the store directory:
+#   index.json                  digest -> crc, sizes and last use time
+#   blobs/<ab>/<digest>.deflate raw deflate data of one part
+#
+# The store is trimmed to MaxBytes by evicting the least recently used parts.
+# Every reuse is CRC-checked while the blob is copied into an archive (see
+# archive_manager._WriteStoredEntry); VerifyAll checks the whole store at once
+# and is exposed as the verify-store subcommand.
+
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Optional
+import hashlib
+import json
+import os
+import time
+import zlib
+
+from .archive_manager import DEFAULT_CHUNK_SIZE, DeflateChecker
+
+# Version of the index layout, stored in the file for future migrations
+INDEX_VERSION = 1
+
+# Default size limit for all stored blobs
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+
+@dataclass
+class StoredPart:
+    # Identity of one stored part and the values its ZIP entry needs.
+    Digest: str
+    CRC: int
+    Size: int
+    CompressedSize: int
+
+
+def _ScanFile(SourcePath: Path, ChunkSize: int) -> tuple[str, int, int]:
+    # Return (SHA-256, CRC-32, size) of a file in a single pass.
+    Digest = hashlib.sha256()
+    Crc = 0
+    Size = 0
+    with open(SourcePath, "rb") as SourceStream:
+        while True:
+            Chunk = SourceStream.read(ChunkSize)
+            if not Chunk:
+                return Digest.hexdigest(), Crc, Size
+            Digest.update(Chunk)
+            Crc = zlib.crc32(Chunk, Crc)
+            Size += len(Chunk)
+
+
+class PartStore:
+    # Content-addressable store of deflate-compressed parts, keyed by the
+    # SHA-256 of the uncompressed data.
+
+    def __init__(self, Directory: Path, MaxBytes: Optional[int] = DEFAULT_MAX_BYTES) -> None:
+        self.Directory = Directory
+        self.MaxBytes = MaxBytes
+        self._IndexPath = Directory / "index.json"
+        self._Entries: dict[str, dict] = self._LoadIndex()
+
+    def _LoadIndex(self) -> dict[str, dict]:
+        # Read the index; a missing or unreadable index starts an empty store.
+        # Blobs left without an index entry are deleted by Trim.
+        if not self._IndexPath.exists():
+            return {}
+        try:
+            with open(self._IndexPath, "r", encoding="utf-8") as IndexFile:
+                IndexData = json.load(IndexFile)
+        except (OSError, ValueError):
+            return {}
+        if IndexData.get("version") != INDEX_VERSION:
+            return {}
+        return IndexData.get("parts", {})
+
+    def _BlobPath(self, Digest: str) -> Path:
+        return self.Directory / "blobs" / Digest[:2] / f"{Digest}.deflate"
+
+    def _ToStoredPart(self, Digest: str) -> StoredPart:
+        Entry = self._Entries[Digest]
+        return StoredPart(Digest=Digest, CRC=Entry["crc"], Size=Entry["size"], CompressedSize=Entry["compressed_size"])
+
+    def _HasIntactBlob(self, Digest: str, Entry: Optional[dict] = None) -> bool:
+        # Cheap check done before a blob is reused: it must exist with the
+        # recorded size. Its CRC is checked while it is copied into the archive.
+        Entry = Entry or self._Entries.get(Digest)
+        if Entry is None:
+            return False
+        try:
+            return os.path.getsize(self._BlobPath(Digest)) == Entry["compressed_size"]
+        except OSError:
+            return False
+
+    def _WriteBlob(self, SourcePath: Path, Digest: str, ChunkSize: int) -> int:
+        # Compress a file into its blob with the same raw deflate format that
+        # zipfile uses for ZIP_DEFLATED entries. Returns the compressed size.
+        BlobPath = self._BlobPath(Digest)
+        BlobPath.parent.mkdir(parents=True, exist_ok=True)
+        TemporaryPath = BlobPath.with_name(f".{BlobPath.name}.partial")
+        Compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        CompressedSize = 0
+        with open(SourcePath, "rb") as SourceStream, open(TemporaryPath, "wb") as BlobStream:
+            while True:
+                Chunk = SourceStream.read(ChunkSize)
+                if not Chunk:
+                    break
+                CompressedChunk = Compressor.compress(Chunk)
+                BlobStream.write(CompressedChunk)
+                CompressedSize += len(CompressedChunk)
+            CompressedChunk = Compressor.flush()
+            BlobStream.write(CompressedChunk)
+            CompressedSize += len(CompressedChunk)
+        os.replace(TemporaryPath, BlobPath)
+        return CompressedSize
+
+    def Put(self, SourcePath: Path, ChunkSize: int = DEFAULT_CHUNK_SIZE) -> StoredPart:
+        # Return the stored part for a file, compressing it only if the same
+        # content is not in the store yet.
+        Digest, Crc, Size = _ScanFile(SourcePath, ChunkSize)
+        if not self._HasIntactBlob(Digest):
+            CompressedSize = self._WriteBlob(SourcePath, Digest, ChunkSize)
+            self._Entries[Digest] = {"crc": Crc, "size": Size, "compressed_size": CompressedSize}
+        self._Entries[Digest]["last_used"] = time.time()
+        return self._ToStoredPart(Digest)
+
+    def OpenBlob(self, Part: StoredPart) -> BinaryIO:
+        # Open the raw deflate data of a stored part for reading.
+        return open(self._BlobPath(Part.Digest), "rb")
+
+    def Verify(self, Digest: str, ChunkSize: int = DEFAULT_CHUNK_SIZE) -> bool:
+        # Decompress a blob and check its CRC and size against the index.
+        # Corrupted or missing parts are dropped so the next Put rebuilds them.
+        Entry = self._Entries.get(Digest)
+        if Entry is None:
+            return False
+
+        Checker = DeflateChecker(ChunkSize)
+        try:
+            with open(self._BlobPath(Digest), "rb") as BlobStream:
+                while True:
+                    Chunk = BlobStream.read(ChunkSize)
+                    if not Chunk:
+                        break
+                    Checker.Update(Chunk)
+            IsValid = Checker.Matches(Entry["crc"], Entry["size"])
+        except (OSError, zlib.error):
+            IsValid = False
+
+        if not IsValid:
+            self._Remove(Digest)
+        return IsValid
+
+    def VerifyAll(self, ChunkSize: int = DEFAULT_CHUNK_SIZE) -> list[str]:
+        # Verify every stored part and return the digests that were dropped.
+        return [Digest for Digest in list(self._Entries) if not self.Verify(Digest, ChunkSize)]
+
+    def Discard(self, Part: StoredPart) -> None:
+        # Drop a part found to be damaged; the next Put compresses it again.
+        self._Remove(Part.Digest)
+
+    def _Remove(self, Digest: str) -> None:
+        self._Entries.pop(Digest, None)
+        self._DeleteBlobFile(self._BlobPath(Digest))
+
+    @staticmethod
+    def _DeleteBlobFile(BlobPath: Path) -> bool:
+        # A blob still open in another process cannot be deleted on Windows;
+        # it is left for a later Trim.
+        try:
+            BlobPath.unlink(missing_ok=True)
+        except OSError:
+            return False
+        return True
+
+    def _RemoveOrphanBlobs(self) -> int:
+        # Delete blob files that have no index entry (left by an unreadable
+        # index or a failed build) so they count against MaxBytes no longer.
+        # Returns the number of deleted files.
+        BlobsDirectory = self.Directory / "blobs"
+        if not BlobsDirectory.is_dir():
+            return 0
+        RemovedCount = 0
+        for BlobPath in BlobsDirectory.glob("*/*.deflate"):
+            if BlobPath.stem not in self._Entries and self._DeleteBlobFile(BlobPath):
+                RemovedCount += 1
+        return RemovedCount
+
+    def _MergeSavedIndex(self) -> None:
+        # Take in the parts another process sharing the store has saved since
+        # this one was opened, so the last Save does not drop them. Only
+        # entries whose blob is still on disk with the recorded size are kept.
+        for Digest, Entry in self._LoadIndex().items():
+            KnownEntry = self._Entries.get(Digest)
+            if KnownEntry is None:
+                if self._HasIntactBlob(Digest, Entry):
+                    self._Entries[Digest] = Entry
+            elif Entry.get("last_used", 0.0) > KnownEntry.get("last_used", 0.0):
+                KnownEntry["last_used"] = Entry["last_used"]
+
+    def PartCount(self) -> int:
+        return len(self._Entries)
+
+    def TotalBytes(self) -> int:
+        return sum(Entry["compressed_size"] for Entry in self._Entries.values())
+
+    def Trim(self) -> int:
+        # Delete unindexed blobs, then evict least recently used parts until
+        # the store fits in MaxBytes. Returns the number of removed blobs.
+        EvictedCount = self._RemoveOrphanBlobs()
+        if self.MaxBytes is None:
+            return EvictedCount
+        TotalBytes = self.TotalBytes()
+        for Digest in sorted(self._Entries, key=lambda Key: self._Entries[Key].get("last_used", 0.0)):
+            if TotalBytes <= self.MaxBytes:
+                break
+            TotalBytes -= self._Entries[Digest]["compressed_size"]
+            self._Remove(Digest)
+            EvictedCount += 1
+        return EvictedCount
+
+    def Save(self) -> None:
+        # Merge the index saved on disk, trim the store and write the index
+        # atomically.
+        self._MergeSavedIndex()
+        self.Trim()
+        self.Directory.mkdir(parents=True, exist_ok=True)
+        TemporaryPath = self._IndexPath.with_name(f".{self._IndexPath.name}.partial")
+        with open(TemporaryPath, "w", encoding="utf-8") as IndexFile:
+            json.dump({"version": INDEX_VERSION, "parts": self._Entries}, IndexFile)
+        os.replace(TemporaryPath, self._IndexPath)
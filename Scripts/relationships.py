@@ -8,11 +8,16 @@
 
 
 from pathlib import Path
-import xml.etree.ElementTree as ElementTree
+from typing import Iterable
+
+from . import xml_backend as XmlBackend
 
 # XML namespace for relationship files (.rels)
 RELATIONSHIPS_NAMESPACE = "http://schemas.openxmlformats.org/package/2006/relationships"
 
+# Prefixes used when writing .rels files
+NAMESPACES = {"": RELATIONSHIPS_NAMESPACE}
+
 # Relationship type used to declare theme variants in the package root
 THEME_VARIANTS_RELATIONSHIP = "http://schemas.microsoft.com/office/2011/relationships/themeVariants"
 
@@ -20,85 +25,130 @@ THEME_VARIANTS_RELATIONSHIP = "http://schemas.microsoft.com/office/2011/relation
 OFFICE_DOCUMENT_RELATIONSHIP = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
 
 
-def _RegisterNamespace() -> None:
-    # Register the namespace so ElementTree writes .rels files correctly.
-    ElementTree.register_namespace("", RELATIONSHIPS_NAMESPACE)
-
-
-def _RelationshipExists(RelationshipRoot: ElementTree.Element, RelationshipType: str, Target: str) -> bool:
-    # Check whether a specific <Relationship> already exists to avoid duplicates.
-    for RelationshipElement in RelationshipRoot.findall(f"{{{RELATIONSHIPS_NAMESPACE}}}Relationship"):
-        if RelationshipElement.get("Type") == RelationshipType and RelationshipElement.get("Target") == Target:
-            return True
-    return False
-
-
-def _GenerateRelationshipId(RelationshipRoot: ElementTree.Element, PreferredId: str) -> str:
-    # Ensure the relationship ID is unique. If the preferred one is taken,
-    # increment numeric suffixes (rId1, rId2, etc.) until an unused one is found.
-    RelationshipIds = []
-    for RelationshipElement in RelationshipRoot.findall(f"{{{RELATIONSHIPS_NAMESPACE}}}Relationship"):
-        ExistingId = RelationshipElement.get("Id")
-        if ExistingId is None:
-            continue
-        RelationshipIds.append(ExistingId)
-
-    if PreferredId not in RelationshipIds:
-        return PreferredId
-
-    NumericSuffix = 1
-    while True:
-        CandidateId = f"rId{NumericSuffix}"
-        if CandidateId not in RelationshipIds:
-            return CandidateId
-        NumericSuffix += 1
+def _ParseNumericId(RelationshipId: str) -> int | None:
+    # Return N for ids of the form "rIdN", or None for any other id.
+    if RelationshipId.startswith("rId") and RelationshipId[3:].isdigit():
+        return int(RelationshipId[3:])
+    return None
+
+
+class RelationshipPart:
+    # In-memory model of one .rels part. Ids and (Type, Target) pairs are kept
+    # in dictionaries next to the XML tree, so existence checks, lookups and id
+    # allocation do not scan the <Relationship> elements.
+
+    def __init__(self, RelationshipRoot: XmlBackend.XmlElement | None = None) -> None:
+        if RelationshipRoot is None:
+            RelationshipRoot = XmlBackend.CreateElement(f"{{{RELATIONSHIPS_NAMESPACE}}}Relationships", NAMESPACES)
+        self.Root = RelationshipRoot
+        self._ElementsById: dict[str, XmlBackend.XmlElement] = {}
+        self._IdsByTypeAndTarget: dict[tuple[str, str], str] = {}
+        # Smallest N that may still be free as "rIdN"; everything below is taken.
+        self._NextNumericId = 1
+
+        for RelationshipElement in RelationshipRoot.findall(f"{{{RELATIONSHIPS_NAMESPACE}}}Relationship"):
+            self._Index(RelationshipElement)
+
+    @classmethod
+    def Load(cls, RelationshipsPath: Path) -> "RelationshipPart":
+        # Read an existing .rels file, or start an empty part if it is missing.
+        if not RelationshipsPath.exists():
+            return cls()
+        return cls(XmlBackend.ParseFile(RelationshipsPath))
+
+    def _Index(self, RelationshipElement: XmlBackend.XmlElement) -> None:
+        RelationshipId = RelationshipElement.get("Id")
+        if RelationshipId is not None:
+            self._ElementsById[RelationshipId] = RelationshipElement
+        RelationshipKey = (RelationshipElement.get("Type"), RelationshipElement.get("Target"))
+        if RelationshipId is not None and RelationshipKey not in self._IdsByTypeAndTarget:
+            self._IdsByTypeAndTarget[RelationshipKey] = RelationshipId
+
+    def Exists(self, RelationshipType: str, Target: str) -> bool:
+        # Check whether a specific <Relationship> already exists.
+        return (RelationshipType, Target) in self._IdsByTypeAndTarget
+
+    def FindId(self, RelationshipType: str, Target: str) -> str | None:
+        # Return the id of the relationship to Target, if any.
+        return self._IdsByTypeAndTarget.get((RelationshipType, Target))
+
+    def GetTarget(self, RelationshipId: str) -> str | None:
+        # Return the target of the relationship with the given id, if any.
+        RelationshipElement = self._ElementsById.get(RelationshipId)
+        return None if RelationshipElement is None else RelationshipElement.get("Target")
+
+    def AllocateId(self, PreferredId: str | None = None) -> str:
+        # Return PreferredId when it is free, otherwise the lowest unused rIdN.
+        # The scan position only moves forward between removals, so allocating
+        # many ids costs amortized constant time per id.
+        if PreferredId is not None and PreferredId not in self._ElementsById:
+            return PreferredId
+        while f"rId{self._NextNumericId}" in self._ElementsById:
+            self._NextNumericId += 1
+        return f"rId{self._NextNumericId}"
+
+    def Add(self, RelationshipType: str, Target: str, PreferredId: str | None = None) -> str:
+        # Add a relationship unless the same (Type, Target) exists; return its id.
+        ExistingId = self.FindId(RelationshipType, Target)
+        if ExistingId is not None:
+            return ExistingId
+
+        RelationshipElement = XmlBackend.AddSubElement(self.Root, f"{{{RELATIONSHIPS_NAMESPACE}}}Relationship")
+        RelationshipElement.set("Type", RelationshipType)
+        RelationshipElement.set("Target", Target)
+        RelationshipElement.set("Id", self.AllocateId(PreferredId))
+        self._Index(RelationshipElement)
+        return RelationshipElement.get("Id")
+
+    def AddMany(self, RelationshipType: str, Targets: Iterable[str]) -> list[str]:
+        # Add one relationship per target, in order, and return their ids.
+        return [self.Add(RelationshipType, Target) for Target in Targets]
+
+    def Remove(self, RelationshipId: str) -> bool:
+        # Remove the relationship with the given id. Returns False if absent.
+        RelationshipElement = self._ElementsById.pop(RelationshipId, None)
+        if RelationshipElement is None:
+            return False
+
+        self.Root.remove(RelationshipElement)
+        RelationshipKey = (RelationshipElement.get("Type"), RelationshipElement.get("Target"))
+        if self._IdsByTypeAndTarget.get(RelationshipKey) == RelationshipId:
+            del self._IdsByTypeAndTarget[RelationshipKey]
+
+        NumericId = _ParseNumericId(RelationshipId)
+        if NumericId is not None and NumericId < self._NextNumericId:
+            self._NextNumericId = NumericId
+        return True
+
+    def RemoveMany(self, RelationshipIds: Iterable[str]) -> int:
+        # Remove several relationships and return how many were found.
+        return sum(1 for RelationshipId in RelationshipIds if self.Remove(RelationshipId))
+
+    def Write(self, RelationshipsPath: Path) -> None:
+        # Save the part as a .rels file.
+        RelationshipsPath.parent.mkdir(parents=True, exist_ok=True)
+        XmlBackend.WriteDocument(self.Root, RelationshipsPath, NAMESPACES)
 
 
 def UpdateRootRelationships(RelationshipsPath: Path) -> None:
     # Ensure that the package-level .rels file links to themeVariantManager.xml.
-    _RegisterNamespace()
-    RelationshipsPath.parent.mkdir(parents=True, exist_ok=True)
-
-    if RelationshipsPath.exists():
-        DocumentTree = ElementTree.parse(RelationshipsPath)
-        RelationshipRoot = DocumentTree.getroot()
-    else:
-        RelationshipRoot = ElementTree.Element(f"{{{RELATIONSHIPS_NAMESPACE}}}Relationships")
-        DocumentTree = ElementTree.ElementTree(RelationshipRoot)
-
-    TargetPath = "/themeVariants/themeVariantManager.xml"
+    RootRelationships = RelationshipPart.Load(RelationshipsPath)
 
     # Add relationship only if it does not already exist.
-    if not _RelationshipExists(RelationshipRoot, THEME_VARIANTS_RELATIONSHIP, TargetPath):
-        RelationshipElement = ElementTree.Element(f"{{{RELATIONSHIPS_NAMESPACE}}}Relationship")
-        RelationshipElement.set("Type", THEME_VARIANTS_RELATIONSHIP)
-        RelationshipElement.set("Target", TargetPath)
-        RelationshipElement.set("Id", _GenerateRelationshipId(RelationshipRoot, "rId3"))
-        RelationshipRoot.append(RelationshipElement)
-
-    DocumentTree.write(RelationshipsPath, encoding="utf-8", xml_declaration=True)
+    RootRelationships.Add(THEME_VARIANTS_RELATIONSHIP, "/themeVariants/themeVariantManager.xml", PreferredId="rId3")
+    RootRelationships.Write(RelationshipsPath)
 
 
-def WriteThemeVariantManagerRelationships(RelationshipsPath: Path, VariantNames: list[str]) -> None:
+def WriteThemeVariantManagerRelationships(RelationshipsPath: Path, VariantNames: list[str]) -> tuple[str, list[str]]:
     # Create a .rels file for each variant manager. It links both the base
-    # themeManager.xml and every variant's own themeManager.xml.
-    _RegisterNamespace()
-    RelationshipsPath.parent.mkdir(parents=True, exist_ok=True)
-
-    RelationshipRoot = ElementTree.Element(f"{{{RELATIONSHIPS_NAMESPACE}}}Relationships")
-
-    BaseRelationship = ElementTree.Element(f"{{{RELATIONSHIPS_NAMESPACE}}}Relationship")
-    BaseRelationship.set("Type", OFFICE_DOCUMENT_RELATIONSHIP)
-    BaseRelationship.set("Target", "/theme/theme/themeManager.xml")
-    BaseRelationship.set("Id", "rId1")
-    RelationshipRoot.append(BaseRelationship)
-
-    for Index, VariantName in enumerate(VariantNames, start=2):
-        VariantRelationship = ElementTree.Element(f"{{{RELATIONSHIPS_NAMESPACE}}}Relationship")
-        VariantRelationship.set("Type", OFFICE_DOCUMENT_RELATIONSHIP)
-        VariantRelationship.set("Target", f"/themeVariants/{VariantName}/theme/theme/themeManager.xml")
-        VariantRelationship.set("Id", f"rId{Index}")
-        RelationshipRoot.append(VariantRelationship)
-
-    DocumentTree = ElementTree.ElementTree(RelationshipRoot)
-    DocumentTree.write(RelationshipsPath, encoding="utf-8", xml_declaration=True)
+    # themeManager.xml and every variant's own themeManager.xml (rId1, rId2, ...).
+    # Returns the id of the base relationship and the ids of the variants, in
+    # order, for the r:id attributes of themeVariantManager.xml.
+    ManagerRelationships = RelationshipPart()
+    PrincipalId = ManagerRelationships.Add(OFFICE_DOCUMENT_RELATIONSHIP, "/theme/theme/themeManager.xml")
+    VariantIds = ManagerRelationships.AddMany(
+        OFFICE_DOCUMENT_RELATIONSHIP,
+        [f"/themeVariants/{VariantName}/theme/theme/themeManager.xml" for VariantName in VariantNames],
+    )
+    ManagerRelationships.Write(RelationshipsPath)
+    return PrincipalId, VariantIds
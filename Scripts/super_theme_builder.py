@@ -5,19 +5,24 @@
 # the base themeVariants folder, updates themeFamily identifiers, generates the
 # required .rels and themeVariantManager.xml files, updates content types, and
 # finally recreates a valid .thmx package containing the new variants.
+# Variants can also be generated from the base theme itself (see
+# variant_generator.py), in which case no variant archive is needed.
 
 
 from dataclasses import dataclass
 from pathlib import Path
 from tempfile import TemporaryDirectory
-from typing import Iterable, Sequence
+from typing import Iterable, Optional, Sequence
 import shutil
 
-from .archive_manager import ExtractArchive, CreateArchiveFromDirectory
+from .archive_manager import DEFAULT_CHUNK_SIZE, ExtractArchive, CreateArchiveFromDirectory
 from .theme_family import EnsureThemeFamily
 from .content_types import UpdateContentTypesForVariants
+from .part_store import PartStore
 from .relationships import UpdateRootRelationships, WriteThemeVariantManagerRelationships
 from .theme_variant_manager import ThemeVariantEntry, WriteThemeVariantManager
+from .thumbnail_renderer import ThumbnailJob, RecolorVariantThumbnails
+from .variant_generator import GeneratedVariant, ApplyVariantScheme, ComputeVariantPalettes, ReadColorScheme
 
 
 @dataclass
@@ -49,10 +54,21 @@ def _CopyVariantContent(VariantSource: Path, VariantDestination: Path) -> None:
         VariantContentTypes.unlink()
 
 
-def _NormalizeVariantDefinitions(VariantArchives: Sequence[Path], VariantNames: Iterable[str] | None) -> list[VariantDefinition]:
-    if not VariantArchives:
-        raise ValueError("At least one variant theme archive must be provided.")
+def _CopyGeneratedVariantContent(BaseSource: Path, VariantDestination: Path) -> None:
+    # Seed a generated variant with a copy of the base theme, skipping the
+    # package [Content_Types].xml and any existing themeVariants folder.
+    # ignore_patterns uses fnmatch, where "[Content_Types]" is a character
+    # class, so the content types file is removed after the copy instead.
+    VariantDestination.mkdir(parents=True, exist_ok=True)
+    IgnoreFunction = shutil.ignore_patterns("themeVariants")
+    shutil.copytree(BaseSource, VariantDestination, dirs_exist_ok=True, ignore=IgnoreFunction)
+
+    VariantContentTypes = VariantDestination / "[Content_Types].xml"
+    if VariantContentTypes.exists():
+        VariantContentTypes.unlink()
 
+
+def _NormalizeVariantDefinitions(VariantArchives: Sequence[Path], VariantNames: Iterable[str] | None) -> list[VariantDefinition]:
     ProvidedNames = list(VariantNames or [])
     while len(ProvidedNames) < len(VariantArchives):
         ProvidedNames.append(f"variant{len(ProvidedNames) + 1}")
@@ -69,24 +85,41 @@ def BuildSuperTheme(
     VariantThemeArchives: Sequence[Path],
     OutputArchive: Path,
     VariantNames: Iterable[str] | None = None,
+    ChunkSize: int = DEFAULT_CHUNK_SIZE,
+    GeneratedVariants: Sequence[GeneratedVariant] = (),
+    RegenerateThumbnails: bool = True,
+    SharedStore: Optional[PartStore] = None,
 ) -> Path:
     # Main workflow: extract, validate, merge variants, update identifiers,
     # write relationships and manager files, update content types, and repackage.
+    # ChunkSize bounds the buffer used to stream part data in and out of archives.
+    # GeneratedVariants are derived from the base theme and added after the
+    # archive variants; their preview images are recolored to match their
+    # palette when RegenerateThumbnails is set and NumPy/Pillow are available.
+    # SharedStore reuses compressed parts across builds (see part_store.py).
+    if not VariantThemeArchives and not GeneratedVariants:
+        raise ValueError("At least one variant theme archive must be provided.")
+
     VariantDefinitions = _NormalizeVariantDefinitions(VariantThemeArchives, VariantNames)
 
+    AllVariantNames = [VariantDefinition.Name for VariantDefinition in VariantDefinitions]
+    AllVariantNames += [GeneratedVariant.Name for GeneratedVariant in GeneratedVariants]
+    if len(set(AllVariantNames)) != len(AllVariantNames):
+        raise ValueError("Variant names must be unique.")
+
     with TemporaryDirectory() as WorkingDirectory:
         WorkingDirectoryPath = Path(WorkingDirectory)
 
         # Extract base theme
         BaseExtractPath = WorkingDirectoryPath / "base"
-        ExtractArchive(BaseThemeArchive, BaseExtractPath)
+        ExtractArchive(BaseThemeArchive, BaseExtractPath, ChunkSize)
         _ValidateThemeSource(BaseExtractPath)
 
         # Extract and validate variants
         VariantExtractPaths: list[Path] = []
         for Index, VariantDefinition in enumerate(VariantDefinitions):
             VariantExtractPath = WorkingDirectoryPath / f"variant_{Index}"
-            ExtractArchive(VariantDefinition.ArchivePath, VariantExtractPath)
+            ExtractArchive(VariantDefinition.ArchivePath, VariantExtractPath, ChunkSize)
             _ValidateThemeSource(VariantExtractPath)
             VariantExtractPaths.append(VariantExtractPath)
 
@@ -98,55 +131,69 @@ def BuildSuperTheme(
             _CopyVariantContent(VariantExtractPath, VariantDestinationPath)
             VariantDestinationPaths.append(VariantDestinationPath)
 
-        # Update themeFamily identifiers for base and variants
+        # Generate variants from the base theme palette and fonts
         BaseThemeXmlPath = BaseExtractPath / "theme" / "theme" / "theme1.xml"
+        if GeneratedVariants:
+            BasePalette = ReadColorScheme(BaseThemeXmlPath)
+            Palettes = ComputeVariantPalettes(BasePalette, GeneratedVariants)
+            ThumbnailJobs: list[ThumbnailJob] = []
+            for GeneratedVariant, Palette in zip(GeneratedVariants, Palettes):
+                VariantDestinationPath = ThemeVariantsPath / GeneratedVariant.Name
+                _CopyGeneratedVariantContent(BaseExtractPath, VariantDestinationPath)
+                ApplyVariantScheme(VariantDestinationPath / "theme" / "theme" / "theme1.xml", GeneratedVariant, Palette, BasePalette)
+                VariantDestinationPaths.append(VariantDestinationPath)
+                ThumbnailJobs.append(ThumbnailJob(VariantDestinationPath, BasePalette, Palette))
+
+            if RegenerateThumbnails:
+                RecolorVariantThumbnails(ThumbnailJobs)
+
+        # Write .rels files linking variants and manager. Every copy has the
+        # same relationships, so the ids of the first one are used below.
+        ThemeVariantRelationshipPaths = [
+            ThemeVariantsPath / "_rels" / "themeVariantManager.xml.rels",
+        ] + [VariantDestinationPath / "_rels" / "themeVariantManager.xml.rels" for VariantDestinationPath in VariantDestinationPaths]
+
+        PrincipalRelationshipId, VariantRelationshipIds = WriteThemeVariantManagerRelationships(ThemeVariantRelationshipPaths[0], AllVariantNames)
+        for RelationshipPath in ThemeVariantRelationshipPaths[1:]:
+            WriteThemeVariantManagerRelationships(RelationshipPath, AllVariantNames)
+
+        # Update themeFamily identifiers for base and variants
         BaseIdentifiers = EnsureThemeFamily(BaseThemeXmlPath, "Principal")
 
         VariantEntries: list[ThemeVariantEntry] = []
-        for RelationshipIndex, (VariantDefinition, VariantDestinationPath) in enumerate(
-            zip(VariantDefinitions, VariantDestinationPaths), start=2
-        ):
+        for VariantName, VariantDestinationPath, RelationshipId in zip(AllVariantNames, VariantDestinationPaths, VariantRelationshipIds):
             VariantThemeXmlPath = VariantDestinationPath / "theme" / "theme" / "theme1.xml"
             VariantIdentifiers = EnsureThemeFamily(
                 VariantThemeXmlPath,
-                VariantDefinition.Name,
+                VariantName,
                 ForceNewIdentifiers=True,
                 OverrideThemeId=BaseIdentifiers.ThemeId,
             )
 
             VariantEntries.append(
                 ThemeVariantEntry(
-                    Name=VariantDefinition.Name,
+                    Name=VariantName,
                     VariantVid=VariantIdentifiers.ThemeVid,
-                    RelationshipId=f"rId{RelationshipIndex}",
+                    RelationshipId=RelationshipId,
                 )
             )
 
-        VariantNamesList = [VariantEntry.Name for VariantEntry in VariantEntries]
-
-        # Write .rels files linking variants and manager
-        ThemeVariantRelationshipPaths = [
-            ThemeVariantsPath / "_rels" / "themeVariantManager.xml.rels",
-        ] + [VariantDestinationPath / "_rels" / "themeVariantManager.xml.rels" for VariantDestinationPath in VariantDestinationPaths]
-
-        for RelationshipPath in ThemeVariantRelationshipPaths:
-            WriteThemeVariantManagerRelationships(RelationshipPath, VariantNamesList)
-
         # Write themeVariantManager.xml describing all variants
         ManagerPath = ThemeVariantsPath / "themeVariantManager.xml"
         WriteThemeVariantManager(
             ManagerPath,
             BaseIdentifiers.ThemeVid,
             VariantEntries,
+            PrincipalRelationshipId,
         )
 
         # Update [Content_Types].xml and root relationships
         ContentTypesPath = BaseExtractPath / "[Content_Types].xml"
-        UpdateContentTypesForVariants(ContentTypesPath, VariantNamesList)
+        UpdateContentTypesForVariants(ContentTypesPath, AllVariantNames)
 
         RootRelationshipsPath = BaseExtractPath / "_rels" / ".rels"
         UpdateRootRelationships(RootRelationshipsPath)
 
         # Generate final .thmx output
         OutputArchivePath = OutputArchive if OutputArchive.suffix else OutputArchive.with_suffix(".thmx")
-        return CreateArchiveFromDirectory(BaseExtractPath, OutputArchivePath)
+        return CreateArchiveFromDirectory(BaseExtractPath, OutputArchivePath, ChunkSize, SharedStore)
@@ -0,0 +1,200 @@
+# super_theme_inspector.py
+#
+# Reports what a super theme archive contains without extracting it: the
+# variants listed in themeVariants/themeVariantManager.xml, their vid and
+# themeFamily identifiers, and how many parts and bytes each variant uses.
+# Only the ZIP central directory and a handful of small XML parts (the root
+# _rels/.rels, the variant manager and its .rels, and each theme1.xml) are
+# read, so many archives can be inspected quickly on a thread pool.
+
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Optional
+import posixpath
+import zipfile
+
+from . import xml_backend as XmlBackend
+from .relationships import THEME_VARIANTS_RELATIONSHIP, RelationshipPart
+from .theme_family import A_NAMESPACE, EXTENSION_URI, THM15_NAMESPACE
+from .theme_variant_manager import R_NAMESPACE, T_NAMESPACE
+
+MANAGER_PART = "themeVariants/themeVariantManager.xml"
+MANAGER_RELATIONSHIPS_PART = "themeVariants/_rels/themeVariantManager.xml.rels"
+ROOT_RELATIONSHIPS_PART = "_rels/.rels"
+
+
+@dataclass
+class VariantReport:
+    # One <t:themeVariant> entry and the parts stored for it.
+    Name: str
+    Vid: Optional[str]
+    RelationshipId: Optional[str]
+    ThemePart: Optional[str] = None
+    ThemeFamilyId: Optional[str] = None
+    ThemeFamilyVid: Optional[str] = None
+    PartCount: int = 0
+    UncompressedSize: int = 0
+    CompressedSize: int = 0
+
+
+@dataclass
+class ArchiveReport:
+    # Summary of one .thmx archive. DuplicateBytes is the compressed size of
+    # every part whose content (CRC and size) already appears in another part.
+    ArchivePath: str
+    PartCount: int = 0
+    UncompressedSize: int = 0
+    CompressedSize: int = 0
+    DuplicateBytes: int = 0
+    HasVariantsRelationship: bool = False
+    Variants: list[VariantReport] = field(default_factory=list)
+    Error: Optional[str] = None
+
+
+def _ResolveTarget(SourcePart: str, Target: str) -> str:
+    # Resolve a relationship target against the folder of the part owning it.
+    if Target.startswith("/"):
+        return Target.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(SourcePart), Target))
+
+
+def _ReadThemeFamily(Archive: zipfile.ZipFile, ThemePart: str) -> tuple[Optional[str], Optional[str]]:
+    # Return (id, vid) of the <thm15:themeFamily> stored in a theme1.xml.
+    RootElement = XmlBackend.ParseBytes(Archive.read(ThemePart))
+    ThemeFamilyElement = RootElement.find(
+        f"{{{A_NAMESPACE}}}extLst/{{{A_NAMESPACE}}}ext[@uri='{EXTENSION_URI}']/{{{THM15_NAMESPACE}}}themeFamily"
+    )
+    if ThemeFamilyElement is None:
+        return None, None
+    return ThemeFamilyElement.get("id"), ThemeFamilyElement.get("vid")
+
+
+def _VariantRoot(PartName: str) -> str:
+    # Folder that owns a part: "themeVariants/<Name>/" for variant parts,
+    # "themeVariants/" for the variant manager itself and "" for the principal
+    # theme (everything outside themeVariants/).
+    Segments = PartName.split("/")
+    if Segments[0] != "themeVariants":
+        return ""
+    if len(Segments) > 2:
+        return f"themeVariants/{Segments[1]}/"
+    return "themeVariants/"
+
+
+def InspectArchive(ArchivePath: Path) -> ArchiveReport:
+    # Build the report of one archive. Unreadable archives are reported with
+    # their error instead of raising, so a directory scan is never interrupted.
+    Report = ArchiveReport(ArchivePath=str(ArchivePath))
+    try:
+        with zipfile.ZipFile(ArchivePath, "r") as Archive:
+            Entries = [Entry for Entry in Archive.infolist() if not Entry.is_dir()]
+            PartNames = {Entry.filename for Entry in Entries}
+
+            # Totals per variant folder, gathered in a single pass.
+            RootTotals: dict[str, list[int]] = {}
+            SeenContents: set[tuple[int, int]] = set()
+            for Entry in Entries:
+                Report.PartCount += 1
+                Report.UncompressedSize += Entry.file_size
+                Report.CompressedSize += Entry.compress_size
+                ContentKey = (Entry.CRC, Entry.file_size)
+                if ContentKey in SeenContents:
+                    Report.DuplicateBytes += Entry.compress_size
+                SeenContents.add(ContentKey)
+
+                Totals = RootTotals.setdefault(_VariantRoot(Entry.filename), [0, 0, 0])
+                Totals[0] += 1
+                Totals[1] += Entry.file_size
+                Totals[2] += Entry.compress_size
+
+            if ROOT_RELATIONSHIPS_PART in PartNames:
+                RootRelationships = RelationshipPart(XmlBackend.ParseBytes(Archive.read(ROOT_RELATIONSHIPS_PART)))
+                Report.HasVariantsRelationship = RootRelationships.FindId(THEME_VARIANTS_RELATIONSHIP, f"/{MANAGER_PART}") is not None
+
+            if MANAGER_PART not in PartNames:
+                return Report
+
+            ManagerRelationships = RelationshipPart()
+            if MANAGER_RELATIONSHIPS_PART in PartNames:
+                ManagerRelationships = RelationshipPart(XmlBackend.ParseBytes(Archive.read(MANAGER_RELATIONSHIPS_PART)))
+
+            ManagerRoot = XmlBackend.ParseBytes(Archive.read(MANAGER_PART))
+            for VariantElement in ManagerRoot.iter(f"{{{T_NAMESPACE}}}themeVariant"):
+                Variant = VariantReport(
+                    Name=VariantElement.get("name", ""),
+                    Vid=VariantElement.get("vid"),
+                    RelationshipId=VariantElement.get(f"{{{R_NAMESPACE}}}id"),
+                )
+                Report.Variants.append(Variant)
+
+                Target = ManagerRelationships.GetTarget(Variant.RelationshipId) if Variant.RelationshipId else None
+                if Target is None:
+                    continue
+                ThemePart = posixpath.join(posixpath.dirname(_ResolveTarget(MANAGER_PART, Target)), "theme1.xml")
+                if ThemePart not in PartNames:
+                    continue
+                Variant.ThemePart = ThemePart
+                Variant.ThemeFamilyId, Variant.ThemeFamilyVid = _ReadThemeFamily(Archive, ThemePart)
+                Variant.PartCount, Variant.UncompressedSize, Variant.CompressedSize = RootTotals.get(_VariantRoot(ThemePart), [0, 0, 0])
+    except Exception as Error:
+        # Anything from a damaged archive (bad deflate data, unsupported
+        # compression, encrypted entries, malformed XML) becomes a report
+        # error, so InspectArchives can go on with the remaining archives.
+        Report.Error = f"{type(Error).__name__}: {Error}"
+    return Report
+
+
+def CollectArchives(Paths: Iterable[Path], Recursive: bool = False) -> list[Path]:
+    # Expand directories into the .thmx archives they contain.
+    ArchivePaths: list[Path] = []
+    for PathItem in Paths:
+        if PathItem.is_dir():
+            Pattern = "**/*.thmx" if Recursive else "*.thmx"
+            ArchivePaths.extend(sorted(PathItem.glob(Pattern)))
+        else:
+            ArchivePaths.append(PathItem)
+    return ArchivePaths
+
+
+def InspectArchives(ArchivePaths: Iterable[Path], MaxWorkers: Optional[int] = None) -> list[ArchiveReport]:
+    # Inspect several archives in parallel, keeping the input order.
+    with ThreadPoolExecutor(max_workers=MaxWorkers) as Executor:
+        return list(Executor.map(InspectArchive, ArchivePaths))
+
+
+def _FormatSize(ByteCount: int) -> str:
+    for Unit in ("B", "KB", "MB"):
+        if ByteCount < 1024:
+            return f"{ByteCount:.0f} {Unit}" if Unit == "B" else f"{ByteCount:.1f} {Unit}"
+        ByteCount /= 1024
+    return f"{ByteCount:.1f} GB"
+
+
+def FormatReportTable(Reports: Iterable[ArchiveReport]) -> str:
+    # Render the reports as a plain-text table, one block per archive.
+    Lines: list[str] = []
+    for Report in Reports:
+        Lines.append(Report.ArchivePath)
+        if Report.Error is not None:
+            Lines.append(f"  error: {Report.Error}")
+            Lines.append("")
+            continue
+
+        DuplicateShare = Report.DuplicateBytes / Report.CompressedSize * 100 if Report.CompressedSize else 0.0
+        Lines.append(
+            f"  parts: {Report.PartCount}  size: {_FormatSize(Report.UncompressedSize)}"
+            f"  compressed: {_FormatSize(Report.CompressedSize)}"
+            f"  duplicated: {_FormatSize(Report.DuplicateBytes)} ({DuplicateShare:.1f}%)"
+            f"  root rel: {'yes' if Report.HasVariantsRelationship else 'no'}"
+        )
+        if Report.Variants:
+            Lines.append(f"  {'variant':<20} {'rId':<6} {'vid':<38} {'themeFamily id':<38} {'parts':>5} {'size':>10}")
+            for Variant in Report.Variants:
+                Lines.append(
+                    f"  {Variant.Name:<20} {Variant.RelationshipId or '-':<6} {Variant.Vid or '-':<38}"
+                    f" {Variant.ThemeFamilyId or '-':<38} {Variant.PartCount:>5} {_FormatSize(Variant.UncompressedSize):>10}"
+                )
+        Lines.append("")
+    return "\n".join(Lines)
@@ -10,12 +10,16 @@ from dataclasses import dataclass # Dataclass: lightweight container for ThemeId
 from pathlib import Path
 from typing import Optional # Optional: indicates that a function may return None.
 from uuid import uuid4 # uuid4: generates random UUIDs for themeId and themeVid.
-import xml.etree.ElementTree as ElementTree
+
+from . import xml_backend as XmlBackend
 
 # XML namespaces used inside theme1.xml
 A_NAMESPACE = "http://schemas.openxmlformats.org/drawingml/2006/main"
 THM15_NAMESPACE = "http://schemas.microsoft.com/office/thememl/2012/main"
 
+# Prefixes used when writing theme1.xml
+NAMESPACES = {"a": A_NAMESPACE, "thm15": THM15_NAMESPACE}
+
 # Identifier used by Microsoft for the <a:ext> that stores <thm15:themeFamily>
 EXTENSION_URI = "{05A4C25C-085E-4340-85A3-A5531E510DB2}"
 
@@ -27,21 +31,15 @@ class ThemeFamilyIdentifiers:
     ThemeVid: str
 
 
-def _RegisterNamespaces() -> None:
-    # Ensures ElementTree writes XML with proper namespace prefixes.
-    ElementTree.register_namespace("a", A_NAMESPACE)
-    ElementTree.register_namespace("thm15", THM15_NAMESPACE)
-
-
-def _FindExtensionList(RootElement: ElementTree.Element) -> ElementTree.Element:
+def _FindExtensionList(RootElement: XmlBackend.XmlElement) -> XmlBackend.XmlElement:
     # Locate or create the <a:extLst> container where themeFamily resides.
     ExtensionList = RootElement.find(f"{{{A_NAMESPACE}}}extLst")
     if ExtensionList is None:
-        ExtensionList = ElementTree.SubElement(RootElement, f"{{{A_NAMESPACE}}}extLst")
+        ExtensionList = XmlBackend.AddSubElement(RootElement, f"{{{A_NAMESPACE}}}extLst", NAMESPACES)
     return ExtensionList
 
 
-def _RemoveExistingThemeFamily(ExtensionList: ElementTree.Element) -> None:
+def _RemoveExistingThemeFamily(ExtensionList: XmlBackend.XmlElement) -> None:
     # Remove any previous <a:ext> entries containing <thm15:themeFamily>.
     ExtensionElements = list(ExtensionList.findall(f"{{{A_NAMESPACE}}}ext"))
     for ExtensionElement in ExtensionElements:
@@ -49,7 +47,7 @@ def _RemoveExistingThemeFamily(ExtensionList: ElementTree.Element) -> None:
             ExtensionList.remove(ExtensionElement)
 
 
-def _FindExistingThemeFamily(ExtensionList: ElementTree.Element) -> Optional[ThemeFamilyIdentifiers]:
+def _FindExistingThemeFamily(ExtensionList: XmlBackend.XmlElement) -> Optional[ThemeFamilyIdentifiers]:
     # Look for an existing themeFamily entry and extract its id and vid if valid.
     for ExtensionElement in ExtensionList.findall(f"{{{A_NAMESPACE}}}ext"):
         if ExtensionElement.get("uri") != EXTENSION_URI:
@@ -74,10 +72,7 @@ def EnsureThemeFamily(
     # Main entry point: ensures that a valid <themeFamily> block exists.
     # - Reuses identifiers unless ForceNewIdentifiers=True.
     # - When generating new IDs, vid is always fresh and id may be overridden.
-    _RegisterNamespaces()
-
-    DocumentTree = ElementTree.parse(ThemeXmlPath)
-    RootElement = DocumentTree.getroot()
+    RootElement = XmlBackend.ParseFile(ThemeXmlPath)
     ExtensionList = _FindExtensionList(RootElement)
 
     if ForceNewIdentifiers:
@@ -91,15 +86,15 @@ def EnsureThemeFamily(
     ThemeId = OverrideThemeId if OverrideThemeId is not None else f"{{{str(uuid4()).upper()}}}"
     ThemeVid = f"{{{str(uuid4()).upper()}}}"
 
-    ThemeFamilyElement = ElementTree.Element(f"{{{THM15_NAMESPACE}}}themeFamily")
+    ThemeFamilyElement = XmlBackend.CreateElement(f"{{{THM15_NAMESPACE}}}themeFamily", {"thm15": THM15_NAMESPACE})
     ThemeFamilyElement.set("name", ThemeName)
     ThemeFamilyElement.set("id", ThemeId)
     ThemeFamilyElement.set("vid", ThemeVid)
 
-    ExtensionElement = ElementTree.Element(f"{{{A_NAMESPACE}}}ext")
+    ExtensionElement = XmlBackend.CreateElement(f"{{{A_NAMESPACE}}}ext", {"a": A_NAMESPACE})
     ExtensionElement.set("uri", EXTENSION_URI)
     ExtensionElement.append(ThemeFamilyElement)
     ExtensionList.append(ExtensionElement)
 
-    DocumentTree.write(ThemeXmlPath, encoding="utf-8", xml_declaration=True)
+    XmlBackend.WriteDocument(RootElement, ThemeXmlPath, NAMESPACES)
     return ThemeFamilyIdentifiers(ThemeId=ThemeId, ThemeVid=ThemeVid)
@@ -9,12 +9,16 @@
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Iterable
-import xml.etree.ElementTree as ElementTree
+
+from . import xml_backend as XmlBackend
 
 # XML namespaces for theme variants and relationship attributes
 T_NAMESPACE = "http://schemas.microsoft.com/office/thememl/2012/main"
 R_NAMESPACE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
 
+# Prefixes used when writing themeVariantManager.xml
+NAMESPACES = {"t": T_NAMESPACE, "r": R_NAMESPACE}
+
 
 @dataclass
 class ThemeVariantEntry:
@@ -25,16 +29,10 @@ class ThemeVariantEntry:
     Height: str = "6858000"
 
 
-def _RegisterNamespaces() -> None:
-    # Register namespace prefixes so ElementTree writes correct XML.
-    ElementTree.register_namespace("t", T_NAMESPACE)
-    ElementTree.register_namespace("r", R_NAMESPACE)
-
-
-def _CreateVariantElement(Parent: ElementTree.Element, VariantEntry: ThemeVariantEntry) -> None:
+def _CreateVariantElement(Parent: XmlBackend.XmlElement, VariantEntry: ThemeVariantEntry) -> None:
     # Add a <themeVariant> entry describing one variant.
     # Includes display name, vid, relationship id, and slide dimensions.
-    VariantElement = ElementTree.SubElement(Parent, f"{{{T_NAMESPACE}}}themeVariant")
+    VariantElement = XmlBackend.AddSubElement(Parent, f"{{{T_NAMESPACE}}}themeVariant")
     VariantElement.set("name", VariantEntry.Name)
     VariantElement.set("vid", VariantEntry.VariantVid)
     VariantElement.set("cx", VariantEntry.Width)
@@ -42,22 +40,25 @@ def _CreateVariantElement(Parent: ElementTree.Element, VariantEntry: ThemeVarian
     VariantElement.set(f"{{{R_NAMESPACE}}}id", VariantEntry.RelationshipId)
 
 
-def WriteThemeVariantManager(ManagerPath: Path, PrincipalVid: str, VariantEntries: Iterable[ThemeVariantEntry]) -> None:
+def WriteThemeVariantManager(
+    ManagerPath: Path,
+    PrincipalVid: str,
+    VariantEntries: Iterable[ThemeVariantEntry],
+    PrincipalRelationshipId: str = "rId1",
+) -> None:
     # Create themeVariantManager.xml listing the base theme and all variants.
-    _RegisterNamespaces()
     ManagerPath.parent.mkdir(parents=True, exist_ok=True)
 
-    ThemeVariantManager = ElementTree.Element(f"{{{T_NAMESPACE}}}themeVariantManager")
-    ThemeVariantList = ElementTree.SubElement(ThemeVariantManager, f"{{{T_NAMESPACE}}}themeVariantLst")
+    ThemeVariantManager = XmlBackend.CreateElement(f"{{{T_NAMESPACE}}}themeVariantManager", NAMESPACES)
+    ThemeVariantList = XmlBackend.AddSubElement(ThemeVariantManager, f"{{{T_NAMESPACE}}}themeVariantLst")
 
     # Add the base theme ("Principal") as the first entry.
     _CreateVariantElement(
         ThemeVariantList,
-        ThemeVariantEntry(Name="Principal", VariantVid=PrincipalVid, RelationshipId="rId1", Width="10972800", Height="6858000"),
+        ThemeVariantEntry(Name="Principal", VariantVid=PrincipalVid, RelationshipId=PrincipalRelationshipId, Width="10972800", Height="6858000"),
     )
 
     for VariantEntry in VariantEntries:
         _CreateVariantElement(ThemeVariantList, VariantEntry)
 
-    DocumentTree = ElementTree.ElementTree(ThemeVariantManager)
-    DocumentTree.write(ManagerPath, encoding="utf-8", xml_declaration=True)
+    XmlBackend.WriteDocument(ThemeVariantManager, ManagerPath, NAMESPACES)
@@ -0,0 +1,127 @@
+# thumbnail_renderer.py
+#
+# Regenerates the preview images stored inside a variant (themeThumbnail.jpeg,
+# auxiliaryThemeThumbnail*.jpeg and docProps/thumbnail.jpeg). When a variant is
+# generated from the base theme its previews are copies of the base ones, so
+# they show the wrong colors. This module recolors them by mapping every pixel
+# close to a base scheme color onto the matching variant color.
+#
+# The stage needs NumPy and Pillow. They are optional: when either is missing,
+# RecolorVariantThumbnails does nothing and the base previews are kept.
+
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+try:
+    import numpy
+    from PIL import Image
+except ImportError:  # Optional dependencies; see module comment.
+    numpy = None
+    Image = None
+
+# Thumbnail files inside a variant folder, relative to the variant root
+THUMBNAIL_PATTERNS = (
+    "theme/theme/themeThumbnail.jpeg",
+    "theme/theme/auxiliaryThemeThumbnail*.jpeg",
+    "docProps/thumbnail.jpeg",
+)
+
+# Maximum RGB distance for a pixel to be treated as a scheme color. JPEG
+# artifacts and anti-aliased edges keep pixels slightly off the exact value.
+DEFAULT_COLOR_TOLERANCE = 48
+
+# Quality used when encoding the recolored JPEG previews
+JPEG_QUALITY = 90
+
+
+@dataclass
+class ThumbnailJob:
+    # Previews of one variant folder and the palette change to apply to them.
+    VariantDirectory: Path
+    BasePalette: dict[str, str]
+    VariantPalette: dict[str, str]
+
+
+def ThumbnailsAvailable() -> bool:
+    # Report whether the optional imaging dependencies are installed.
+    return numpy is not None and Image is not None
+
+
+def _HexToRgb(Value: str) -> tuple[int, int, int]:
+    return int(Value[0:2], 16), int(Value[2:4], 16), int(Value[4:6], 16)
+
+
+def _BuildColorMapping(BasePalette: dict[str, str], VariantPalette: dict[str, str]) -> tuple["numpy.ndarray", "numpy.ndarray"]:
+    # Return (SourceColors, ColorDeltas) as K x 3 arrays, one row per distinct
+    # base color. When several slots share a base color, a slot that actually
+    # changes wins over one that keeps the color.
+    ColorMapping: dict[str, str] = {}
+    for Slot, SourceValue in BasePalette.items():
+        TargetValue = VariantPalette.get(Slot, SourceValue)
+        if SourceValue not in ColorMapping or ColorMapping[SourceValue] == SourceValue:
+            ColorMapping[SourceValue] = TargetValue
+
+    SourceColors = numpy.array([_HexToRgb(Value) for Value in ColorMapping], dtype=numpy.int16)
+    TargetColors = numpy.array([_HexToRgb(Value) for Value in ColorMapping.values()], dtype=numpy.int16)
+    return SourceColors, TargetColors - SourceColors
+
+
+def _RecolorPixels(Pixels: "numpy.ndarray", SourceColors: "numpy.ndarray", ColorDeltas: "numpy.ndarray", Tolerance: int) -> "numpy.ndarray":
+    # Map all pixels at once: find the nearest base color of every pixel and, if
+    # it is within Tolerance, shift the pixel by that color's delta. Shifting
+    # (instead of replacing) keeps shading and anti-aliasing intact. The loop
+    # runs over the few scheme colors only, so memory stays linear in pixels.
+    if len(SourceColors) == 0:
+        return Pixels
+    Flat = Pixels.reshape(-1, 3).astype(numpy.int32)
+    BestDistance = numpy.full(len(Flat), numpy.iinfo(numpy.int32).max, dtype=numpy.int32)
+    NearestIndex = numpy.zeros(len(Flat), dtype=numpy.intp)
+    for ColorIndex, SourceColor in enumerate(SourceColors):
+        Distance = ((Flat - SourceColor) ** 2).sum(axis=1)
+        IsCloser = Distance < BestDistance
+        BestDistance[IsCloser] = Distance[IsCloser]
+        NearestIndex[IsCloser] = ColorIndex
+    WithinTolerance = BestDistance <= Tolerance * Tolerance
+
+    Recolored = Flat + ColorDeltas[NearestIndex] * WithinTolerance[:, None]
+    return numpy.clip(Recolored, 0, 255).astype(numpy.uint8).reshape(Pixels.shape)
+
+
+def _RecolorImage(ImagePath: Path, SourceColors: "numpy.ndarray", ColorDeltas: "numpy.ndarray", Tolerance: int) -> None:
+    # Decode, recolor and re-encode one preview in place.
+    with Image.open(ImagePath) as SourceImage:
+        Pixels = numpy.asarray(SourceImage.convert("RGB"))
+    Recolored = _RecolorPixels(Pixels, SourceColors, ColorDeltas, Tolerance)
+    Image.fromarray(Recolored, "RGB").save(ImagePath, "JPEG", quality=JPEG_QUALITY)
+
+
+def RecolorVariantThumbnails(
+    Jobs: Iterable[ThumbnailJob],
+    Tolerance: int = DEFAULT_COLOR_TOLERANCE,
+    MaxWorkers: Optional[int] = None,
+) -> int:
+    # Recolor the previews of every job on a thread pool (Pillow releases the
+    # GIL while decoding and encoding). Returns the number of images written.
+    if not ThumbnailsAvailable():
+        return 0
+
+    Tasks = []
+    for Job in Jobs:
+        if Job.BasePalette == Job.VariantPalette:
+            continue
+        SourceColors, ColorDeltas = _BuildColorMapping(Job.BasePalette, Job.VariantPalette)
+        # Nothing to map (e.g. an empty base palette): keep the previews as is.
+        if not ColorDeltas.any():
+            continue
+        for Pattern in THUMBNAIL_PATTERNS:
+            for ImagePath in Job.VariantDirectory.glob(Pattern):
+                Tasks.append((ImagePath, SourceColors, ColorDeltas))
+
+    with ThreadPoolExecutor(max_workers=MaxWorkers) as Executor:
+        Futures = [Executor.submit(_RecolorImage, ImagePath, SourceColors, ColorDeltas, Tolerance) for ImagePath, SourceColors, ColorDeltas in Tasks]
+        for Future in Futures:
+            Future.result()
+    return len(Tasks)
@@ -0,0 +1,182 @@
+# variant_generator.py
+#
+# Generates theme variants programmatically from the base theme, instead of
+# requiring a hand-made .thmx per variant. Each variant is described by a row
+# in a palette/font table (colors, an optional hue shift, and the major/minor
+# Latin typefaces). The base theme1.xml color scheme is read once, all palettes
+# are computed together, and the results are written straight into copies of
+# the base theme inside themeVariants/<VariantName>.
+
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Optional
+import colorsys
+import json
+
+from . import xml_backend as XmlBackend
+
+# XML namespace used inside theme1.xml
+A_NAMESPACE = "http://schemas.openxmlformats.org/drawingml/2006/main"
+
+# Prefixes used when writing theme1.xml
+NAMESPACES = {"a": A_NAMESPACE}
+
+# Color slots of <a:clrScheme>, in the order defined by DrawingML
+COLOR_SLOTS = (
+    "dk1", "lt1", "dk2", "lt2",
+    "accent1", "accent2", "accent3", "accent4", "accent5", "accent6",
+    "hlink", "folHlink",
+)
+
+# Slots left untouched by a hue shift (text and background colors)
+NEUTRAL_SLOTS = ("dk1", "lt1", "dk2", "lt2")
+
+
+@dataclass
+class GeneratedVariant:
+    # One row of the variant table.
+    # - Colors: explicit RRGGBB values per slot; they win over the hue shift.
+    # - HueShift: degrees to rotate the base accent and hyperlink colors.
+    # - MajorFont / MinorFont: Latin typefaces for headings and body text.
+    Name: str
+    Colors: dict[str, str] = field(default_factory=dict)
+    HueShift: float = 0.0
+    MajorFont: Optional[str] = None
+    MinorFont: Optional[str] = None
+
+
+def _NormalizeHexColor(Value: str) -> str:
+    # Accept "RRGGBB" or "#RRGGBB" and return the uppercase form used by Office.
+    Candidate = Value.strip().lstrip("#").upper()
+    if len(Candidate) != 6 or any(Character not in "0123456789ABCDEF" for Character in Candidate):
+        raise ValueError(f"Invalid RGB color value: {Value}")
+    return Candidate
+
+
+def _ParseVariantRow(Row: dict) -> GeneratedVariant:
+    # Convert one JSON table row into a GeneratedVariant, validating slot names.
+    if "name" not in Row:
+        raise ValueError("Every variant in the table needs a 'name'.")
+    # The name becomes the folder themeVariants/<Name>, so it must be a single
+    # path segment.
+    Name = str(Row["name"])
+    if not Name.strip() or "/" in Name or "\\" in Name or ".." in Name:
+        raise ValueError(f"Invalid variant name '{Name}': it must be a plain folder name.")
+
+    Colors = {}
+    for Slot, Value in (Row.get("colors") or {}).items():
+        if Slot not in COLOR_SLOTS:
+            raise ValueError(f"Unknown color slot '{Slot}' in variant '{Name}'.")
+        Colors[Slot] = _NormalizeHexColor(Value)
+
+    return GeneratedVariant(
+        Name=Name,
+        Colors=Colors,
+        HueShift=float(Row.get("hue_shift", 0.0)),
+        MajorFont=Row.get("major_font"),
+        MinorFont=Row.get("minor_font"),
+    )
+
+
+def LoadVariantTable(TablePath: Path) -> list[GeneratedVariant]:
+    # Read a JSON variant table. The file may be a list of rows or an object
+    # with a "variants" list, e.g.:
+    # {"variants": [{"name": "Azul", "hue_shift": 180, "major_font": "Georgia",
+    #                "colors": {"accent1": "1F4E79"}}]}
+    with open(TablePath, "r", encoding="utf-8") as TableFile:
+        TableData = json.load(TableFile)
+
+    Rows = TableData.get("variants", []) if isinstance(TableData, dict) else TableData
+    return [_ParseVariantRow(Row) for Row in Rows]
+
+
+def ReadColorScheme(ThemeXmlPath: Path) -> dict[str, str]:
+    # Return the RRGGBB value of each <a:clrScheme> slot in theme1.xml.
+    # System colors (<a:sysClr>) are resolved through their lastClr attribute.
+    RootElement = XmlBackend.ParseFile(ThemeXmlPath)
+    ColorScheme = RootElement.find(f"{{{A_NAMESPACE}}}themeElements/{{{A_NAMESPACE}}}clrScheme")
+    if ColorScheme is None:
+        raise ValueError(f"No color scheme found in {ThemeXmlPath}")
+
+    SchemeColors: dict[str, str] = {}
+    for Slot in COLOR_SLOTS:
+        SlotElement = ColorScheme.find(f"{{{A_NAMESPACE}}}{Slot}")
+        if SlotElement is None or len(SlotElement) == 0:
+            continue
+        ColorElement = SlotElement[0]
+        Value = ColorElement.get("val") if ColorElement.tag == f"{{{A_NAMESPACE}}}srgbClr" else ColorElement.get("lastClr")
+        if Value is not None:
+            SchemeColors[Slot] = _NormalizeHexColor(Value)
+    return SchemeColors
+
+
+def ComputeVariantPalettes(BaseColors: dict[str, str], Variants: Iterable[GeneratedVariant]) -> list[dict[str, str]]:
+    # Compute the full palette of every variant in one pass. The base slots are
+    # converted to HLS once and reused for all variants; each variant applies its
+    # hue shift to the non-neutral slots and then its explicit color overrides.
+    BaseHls = {}
+    for Slot, Value in BaseColors.items():
+        Red, Green, Blue = (int(Value[Index:Index + 2], 16) / 255.0 for Index in (0, 2, 4))
+        BaseHls[Slot] = colorsys.rgb_to_hls(Red, Green, Blue)
+
+    Palettes: list[dict[str, str]] = []
+    for Variant in Variants:
+        Palette = dict(BaseColors)
+        HueOffset = (Variant.HueShift / 360.0) % 1.0
+        if HueOffset:
+            for Slot, (Hue, Lightness, Saturation) in BaseHls.items():
+                if Slot in NEUTRAL_SLOTS:
+                    continue
+                Red, Green, Blue = colorsys.hls_to_rgb((Hue + HueOffset) % 1.0, Lightness, Saturation)
+                Palette[Slot] = "".join(f"{round(Channel * 255):02X}" for Channel in (Red, Green, Blue))
+        Palette.update(Variant.Colors)
+        Palettes.append(Palette)
+    return Palettes
+
+
+def _SetLatinTypeface(FontScheme: XmlBackend.XmlElement, FontKind: str, Typeface: Optional[str]) -> None:
+    # Replace the <a:latin typeface> of <a:majorFont> or <a:minorFont>.
+    if Typeface is None:
+        return
+    LatinElement = FontScheme.find(f"{{{A_NAMESPACE}}}{FontKind}/{{{A_NAMESPACE}}}latin")
+    if LatinElement is None:
+        return
+    LatinElement.set("typeface", Typeface)
+    # The panose classification belongs to the previous typeface.
+    LatinElement.attrib.pop("panose", None)
+
+
+def ApplyVariantScheme(ThemeXmlPath: Path, Variant: GeneratedVariant, Palette: dict[str, str], BaseColors: dict[str, str]) -> None:
+    # Write the variant palette and fonts into a copy of theme1.xml. Only slots
+    # whose color differs from BaseColors are rewritten, so untouched slots keep
+    # their original element (e.g. <a:sysClr val="windowText"/> stays linked to
+    # the system color).
+    RootElement = XmlBackend.ParseFile(ThemeXmlPath)
+    ThemeElements = RootElement.find(f"{{{A_NAMESPACE}}}themeElements")
+    if ThemeElements is None:
+        raise ValueError(f"No themeElements found in {ThemeXmlPath}")
+
+    ColorScheme = ThemeElements.find(f"{{{A_NAMESPACE}}}clrScheme")
+    if ColorScheme is not None:
+        ColorScheme.set("name", Variant.Name)
+        for Slot, Value in Palette.items():
+            if BaseColors.get(Slot) == Value:
+                continue
+            SlotElement = ColorScheme.find(f"{{{A_NAMESPACE}}}{Slot}")
+            if SlotElement is None:
+                continue
+            # Replace srgbClr/sysClr with a plain RGB value.
+            for ChildElement in list(SlotElement):
+                SlotElement.remove(ChildElement)
+            ColorElement = XmlBackend.AddSubElement(SlotElement, f"{{{A_NAMESPACE}}}srgbClr")
+            ColorElement.set("val", Value)
+
+    FontScheme = ThemeElements.find(f"{{{A_NAMESPACE}}}fontScheme")
+    if FontScheme is not None:
+        if Variant.MajorFont is not None or Variant.MinorFont is not None:
+            FontScheme.set("name", Variant.Name)
+        _SetLatinTypeface(FontScheme, "majorFont", Variant.MajorFont)
+        _SetLatinTypeface(FontScheme, "minorFont", Variant.MinorFont)
+
+    XmlBackend.WriteDocument(RootElement, ThemeXmlPath, NAMESPACES)
@@ -0,0 +1,121 @@
+# xml_backend.py
+#
+# Thin layer over the XML library used to read and write OpenXML parts. lxml
+# is used when it is installed because it parses and serializes large parts
+# much faster; otherwise the standard library xml.etree.ElementTree is used.
+# Both backends produce equivalent documents with the same namespace prefixes:
+# lxml keeps the prefixes of parsed documents and of the namespace maps given
+# here. ElementTree keeps prefixes in one global map, so a namespace is only
+# registered again when another part type has replaced its prefix in the
+# meantime (e.g. the default namespace of .rels and [Content_Types].xml).
+
+
+from pathlib import Path
+from typing import Any, Optional
+import xml.etree.ElementTree as StdlibTree
+
+try:
+    from lxml import etree as LxmlTree
+except ImportError:  # lxml is optional; see module comment.
+    LxmlTree = None
+
+# Element type returned by this module (lxml or ElementTree element)
+XmlElement = Any
+
+# Exceptions raised for malformed XML by either backend
+XmlParseError: tuple[type[Exception], ...] = (StdlibTree.ParseError,) if LxmlTree is None else (StdlibTree.ParseError, LxmlTree.XMLSyntaxError)
+
+BACKEND_LXML = "lxml"
+BACKEND_STDLIB = "stdlib"
+
+_ActiveBackend = BACKEND_LXML if LxmlTree is not None else BACKEND_STDLIB
+_RegisteredPrefixes: dict[str, str] = {}
+
+
+def GetBackend() -> str:
+    return _ActiveBackend
+
+
+def SetBackend(BackendName: str) -> None:
+    # Select the backend explicitly (used by the benchmark and for debugging).
+    global _ActiveBackend
+    if BackendName == BACKEND_LXML and LxmlTree is None:
+        raise ImportError("The lxml backend was requested but lxml is not installed.")
+    if BackendName not in (BACKEND_LXML, BACKEND_STDLIB):
+        raise ValueError(f"Unknown XML backend: {BackendName}")
+    _ActiveBackend = BackendName
+
+
+def _UsesLxml() -> bool:
+    return _ActiveBackend == BACKEND_LXML
+
+
+def _RegisterNamespaces(Namespaces: Optional[dict[str, str]]) -> None:
+    # Register the namespaces with ElementTree unless they are still in place.
+    for Prefix, Uri in (Namespaces or {}).items():
+        if _RegisteredPrefixes.get(Prefix) == Uri:
+            continue
+        StdlibTree.register_namespace(Prefix, Uri)
+        # register_namespace drops older entries for the same prefix or URI.
+        for KnownPrefix, KnownUri in list(_RegisteredPrefixes.items()):
+            if KnownUri == Uri:
+                del _RegisteredPrefixes[KnownPrefix]
+        _RegisteredPrefixes[Prefix] = Uri
+
+
+def _ToNamespaceMap(Namespaces: Optional[dict[str, str]]) -> Optional[dict[Optional[str], str]]:
+    # lxml uses None instead of "" for the default namespace.
+    if not Namespaces:
+        return None
+    return {(Prefix or None): Uri for Prefix, Uri in Namespaces.items()}
+
+
+def ParseFile(XmlPath: Path) -> XmlElement:
+    # Parse an XML file and return its root element.
+    with open(XmlPath, "rb") as XmlFile:
+        if _UsesLxml():
+            return LxmlTree.parse(XmlFile).getroot()
+        return StdlibTree.parse(XmlFile).getroot()
+
+
+def ParseBytes(XmlData: bytes) -> XmlElement:
+    # Parse an XML document held in memory and return its root element.
+    if _UsesLxml():
+        return LxmlTree.fromstring(XmlData)
+    return StdlibTree.fromstring(XmlData)
+
+
+def CreateElement(Tag: str, Namespaces: Optional[dict[str, str]] = None) -> XmlElement:
+    # Create a detached element. Namespaces maps prefixes ("" for the default
+    # namespace) to URIs and decides the prefixes used when it is written.
+    if _UsesLxml():
+        return LxmlTree.Element(Tag, nsmap=_ToNamespaceMap(Namespaces))
+    _RegisterNamespaces(Namespaces)
+    return StdlibTree.Element(Tag)
+
+
+def AddSubElement(Parent: XmlElement, Tag: str, Namespaces: Optional[dict[str, str]] = None) -> XmlElement:
+    # Append a new child element to Parent and return it.
+    if _UsesLxml():
+        return LxmlTree.SubElement(Parent, Tag, nsmap=_ToNamespaceMap(Namespaces))
+    _RegisterNamespaces(Namespaces)
+    return StdlibTree.SubElement(Parent, Tag)
+
+
+def SerializeDocument(RootElement: XmlElement, Namespaces: Optional[dict[str, str]] = None) -> bytes:
+    # Return the document as UTF-8 bytes with an XML declaration.
+    if _UsesLxml():
+        return LxmlTree.tostring(RootElement.getroottree(), encoding="utf-8", xml_declaration=True)
+    _RegisterNamespaces(Namespaces)
+    return StdlibTree.tostring(RootElement, encoding="utf-8", xml_declaration=True)
+
+
+def WriteDocument(RootElement: XmlElement, XmlPath: Path, Namespaces: Optional[dict[str, str]] = None) -> None:
+    # Write the document to disk as UTF-8 with an XML declaration. Namespaces
+    # are the prefixes the document should use with the ElementTree backend.
+    with open(XmlPath, "wb") as XmlFile:
+        if _UsesLxml():
+            RootElement.getroottree().write(XmlFile, encoding="utf-8", xml_declaration=True)
+            return
+        _RegisterNamespaces(Namespaces)
+        StdlibTree.ElementTree(RootElement).write(XmlFile, encoding="utf-8", xml_declaration=True)
@@ -0,0 +1,140 @@
+# xml_benchmark.py
+#
+# Compares the XML backends (see xml_backend.py) on large synthetic parts: a
+# theme1.xml with many font and format entries and a [Content_Types].xml with
+# many overrides. Each backend runs the real update functions used by the
+# builder, and the outputs of both backends are checked for equivalence
+# (canonical XML with the generated GUIDs masked, plus identical prefixes).
+#
+# Usage: python -m Scripts.xml_benchmark [--entries N] [--variants N] [--repeat N]
+
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import argparse
+import re
+import shutil
+import time
+import xml.etree.ElementTree as ElementTree
+
+from . import xml_backend as XmlBackend
+from .content_types import CONTENT_TYPES_NAMESPACE, UpdateContentTypesForVariants
+from .theme_family import A_NAMESPACE, EnsureThemeFamily
+
+GUID_PATTERN = re.compile(r"\{[0-9A-F]{8}-[0-9A-F]{4}-[0-9A-F]{4}-[0-9A-F]{4}-[0-9A-F]{12}\}")
+PREFIX_PATTERN = re.compile(r"<(/?[\w.-]+):")
+
+
+def _WriteSyntheticTheme(ThemeXmlPath: Path, EntryCount: int) -> None:
+    # A theme1.xml shaped like a real one, with EntryCount script fonts and
+    # gradient fills to make it as large as the biggest corporate themes.
+    Fonts = "".join(f'<a:font script="S{Index:05d}" typeface="Font {Index}"/>' for Index in range(EntryCount))
+    Fills = "".join(
+        f'<a:gradFill rotWithShape="1"><a:gsLst><a:gs pos="{Index % 100000}"><a:schemeClr val="phClr">'
+        f'<a:tint val="{Index % 100000}"/><a:satMod val="105000"/></a:schemeClr></a:gs></a:gsLst>'
+        f'<a:lin ang="5400000" scaled="0"/></a:gradFill>'
+        for Index in range(EntryCount)
+    )
+    ThemeXmlPath.write_text(
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<a:theme xmlns:a="{A_NAMESPACE}" name="Synthetic"><a:themeElements>'
+        '<a:clrScheme name="Synthetic"><a:dk1><a:srgbClr val="000000"/></a:dk1><a:lt1><a:srgbClr val="FFFFFF"/></a:lt1></a:clrScheme>'
+        f'<a:fontScheme name="Synthetic"><a:majorFont><a:latin typeface="Arial"/>{Fonts}</a:majorFont>'
+        f'<a:minorFont><a:latin typeface="Arial"/>{Fonts}</a:minorFont></a:fontScheme>'
+        f'<a:fmtScheme name="Synthetic"><a:fillStyleLst>{Fills}</a:fillStyleLst></a:fmtScheme>'
+        "</a:themeElements><a:objectDefaults/><a:extraClrSchemeLst/></a:theme>",
+        encoding="utf-8",
+    )
+
+
+def _WriteSyntheticContentTypes(ContentTypesPath: Path, EntryCount: int) -> None:
+    # A [Content_Types].xml with EntryCount existing part overrides.
+    Overrides = "".join(
+        f'<Override PartName="/theme/slideLayouts/slideLayout{Index}.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.presentationml.slideLayout+xml"/>'
+        for Index in range(EntryCount)
+    )
+    ContentTypesPath.write_text(
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<Types xmlns="{CONTENT_TYPES_NAMESPACE}"><Default Extension="png" ContentType="image/png"/>'
+        f'<Default Extension="xml" ContentType="application/xml"/>{Overrides}</Types>',
+        encoding="utf-8",
+    )
+
+
+def _Normalize(XmlPath: Path) -> tuple[str, list[str]]:
+    # Canonical form (GUIDs masked) and the set of prefixes used in the file.
+    XmlText = XmlPath.read_text(encoding="utf-8")
+    Canonical = GUID_PATTERN.sub("{GUID}", ElementTree.canonicalize(XmlText))
+    return Canonical, sorted({Prefix.lstrip("/") for Prefix in PREFIX_PATTERN.findall(XmlText)})
+
+
+def _RunBackend(BackendName: str, SourceDirectory: Path, WorkDirectory: Path, VariantNames: list[str], Repeat: int) -> dict[str, float]:
+    # Time EnsureThemeFamily and UpdateContentTypesForVariants on fresh copies
+    # of the synthetic parts; return the best time of Repeat runs per step.
+    XmlBackend.SetBackend(BackendName)
+    Timings = {"theme1.xml": float("inf"), "[Content_Types].xml": float("inf")}
+    for _ in range(Repeat):
+        shutil.copytree(SourceDirectory, WorkDirectory, dirs_exist_ok=True)
+
+        StartTime = time.perf_counter()
+        EnsureThemeFamily(WorkDirectory / "theme1.xml", "Benchmark", ForceNewIdentifiers=True)
+        Timings["theme1.xml"] = min(Timings["theme1.xml"], time.perf_counter() - StartTime)
+
+        StartTime = time.perf_counter()
+        UpdateContentTypesForVariants(WorkDirectory / "[Content_Types].xml", VariantNames)
+        Timings["[Content_Types].xml"] = min(Timings["[Content_Types].xml"], time.perf_counter() - StartTime)
+    return Timings
+
+
+def RunBenchmark(EntryCount: int, VariantCount: int, Repeat: int) -> bool:
+    # Print a timing table for every available backend and return whether
+    # their outputs are equivalent.
+    Backends = [XmlBackend.BACKEND_STDLIB]
+    if XmlBackend.LxmlTree is not None:
+        Backends.append(XmlBackend.BACKEND_LXML)
+    else:
+        print("lxml is not installed; only the stdlib backend is measured.")
+
+    VariantNames = [f"variant{Index + 1}" for Index in range(VariantCount)]
+    OriginalBackend = XmlBackend.GetBackend()
+    try:
+        with TemporaryDirectory() as WorkingDirectory:
+            WorkingDirectoryPath = Path(WorkingDirectory)
+            SourceDirectory = WorkingDirectoryPath / "source"
+            SourceDirectory.mkdir()
+            _WriteSyntheticTheme(SourceDirectory / "theme1.xml", EntryCount)
+            _WriteSyntheticContentTypes(SourceDirectory / "[Content_Types].xml", EntryCount)
+            ThemeSize = (SourceDirectory / "theme1.xml").stat().st_size
+            ContentTypesSize = (SourceDirectory / "[Content_Types].xml").stat().st_size
+            print(f"theme1.xml: {ThemeSize / 1024:.0f} KB, [Content_Types].xml: {ContentTypesSize / 1024:.0f} KB, variants: {VariantCount}")
+
+            Results: dict[str, dict[str, float]] = {}
+            Outputs: dict[str, dict[str, tuple[str, list[str]]]] = {}
+            for BackendName in Backends:
+                WorkDirectory = WorkingDirectoryPath / BackendName
+                Results[BackendName] = _RunBackend(BackendName, SourceDirectory, WorkDirectory, VariantNames, Repeat)
+                Outputs[BackendName] = {PartName: _Normalize(WorkDirectory / PartName) for PartName in Results[BackendName]}
+    finally:
+        XmlBackend.SetBackend(OriginalBackend)
+
+    print(f"{'part':<22}" + "".join(f"{BackendName:>12}" for BackendName in Backends))
+    for PartName in Results[Backends[0]]:
+        print(f"{PartName:<22}" + "".join(f"{Results[BackendName][PartName] * 1000:>10.1f}ms" for BackendName in Backends))
+
+    IsEquivalent = all(Outputs[BackendName] == Outputs[Backends[0]] for BackendName in Backends)
+    print(f"equivalent output: {'yes' if IsEquivalent else 'NO'}")
+    return IsEquivalent
+
+
+def Main() -> int:
+    Parser = argparse.ArgumentParser(description="Benchmark the XML backends on large synthetic theme parts.")
+    Parser.add_argument("--entries", dest="EntryCount", type=int, default=20000, help="Number of synthetic font/fill entries and content type overrides")
+    Parser.add_argument("--variants", dest="VariantCount", type=int, default=50, help="Number of variants registered in [Content_Types].xml")
+    Parser.add_argument("--repeat", dest="Repeat", type=int, default=3, help="Runs per backend; the best time is reported")
+    ParsedArguments = Parser.parse_args()
+    return 0 if RunBenchmark(ParsedArguments.EntryCount, ParsedArguments.VariantCount, ParsedArguments.Repeat) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(Main())
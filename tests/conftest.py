@@ -0,0 +1,32 @@
+# conftest.py
+#
+# Shared fixtures for the tests. The sample themes in Test/ are used as build
+# inputs; the repository root is put on sys.path so the Scripts package can be
+# imported when pytest is started from any folder.
+
+
+from pathlib import Path
+import sys
+import zipfile
+
+import pytest
+
+REPOSITORY_ROOT = Path(__file__).resolve().parent.parent
+if str(REPOSITORY_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPOSITORY_ROOT))
+
+SAMPLE_THEMES_DIRECTORY = REPOSITORY_ROOT / "Test"
+
+
+@pytest.fixture
+def SampleThemes() -> Path:
+    return SAMPLE_THEMES_DIRECTORY
+
+
+def AssertArchiveIsValid(ArchivePath: Path) -> None:
+    # testzip() checks the CRC of every entry; read() does the same per entry
+    # and also fails on a truncated or invalid deflate stream.
+    with zipfile.ZipFile(ArchivePath, "r") as Archive:
+        assert Archive.testzip() is None
+        for EntryInfo in Archive.infolist():
+            assert len(Archive.read(EntryInfo)) == EntryInfo.file_size
@@ -0,0 +1,80 @@
+# test_batch_runner.py
+#
+# Journal handling of RunBatch: finished jobs are skipped on the next run,
+# failed jobs and changed outputs are built again.
+
+
+from pathlib import Path
+import json
+import shutil
+
+import pytest
+
+from conftest import AssertArchiveIsValid
+from Scripts.batch_runner import STATUS_DONE, STATUS_FAILED, LoadBatchJobs, RunBatch
+
+
+def _WriteJobFile(WorkDirectory: Path, SampleThemes: Path) -> Path:
+    for ThemeName in ("Tema A.thmx", "Tema B.thmx", "Tema C.thmx"):
+        shutil.copy(SampleThemes / ThemeName, WorkDirectory / ThemeName)
+    JobFilePath = WorkDirectory / "jobs.json"
+    JobFilePath.write_text(
+        json.dumps(
+            {
+                "jobs": [
+                    {"base": "Tema A.thmx", "variants": ["Tema B.thmx"], "variant_names": ["B"], "output": "out/AB"},
+                    {"base": "Tema A.thmx", "variants": ["Tema C.thmx"], "variant_names": ["C"], "output": "out/AC.thmx"},
+                    {"base": "Tema A.thmx", "variants": ["Missing.thmx"], "output": "out/AX.thmx"},
+                ]
+            }
+        ),
+        encoding="utf-8",
+    )
+    return JobFilePath
+
+
+def test_RerunSkipsFinishedJobsAndRetriesFailures(tmp_path: Path, SampleThemes: Path) -> None:
+    JobFilePath = _WriteJobFile(tmp_path, SampleThemes)
+    JournalPath = tmp_path / "journal.json"
+    Jobs = LoadBatchJobs(JobFilePath)
+    assert Jobs[0].Output == tmp_path / "out" / "AB.thmx"
+
+    Summary = RunBatch(Jobs, JournalPath)
+    assert (Summary.Built, Summary.Skipped, Summary.Failed) == (2, 0, 1)
+    for Job in Jobs[:2]:
+        AssertArchiveIsValid(Job.Output)
+    Journal = json.loads(JournalPath.read_text(encoding="utf-8"))
+    assert [Journal["jobs"][Job.Key]["status"] for Job in Jobs] == [STATUS_DONE, STATUS_DONE, STATUS_FAILED]
+
+    # Nothing changed: the finished jobs are skipped, the failed one retried.
+    Summary = RunBatch(Jobs, JournalPath)
+    assert (Summary.Built, Summary.Skipped, Summary.Failed) == (0, 2, 1)
+
+    # A changed output and a fixed input are built again.
+    Jobs[1].Output.write_bytes(b"changed")
+    shutil.copy(SampleThemes / "Tema D.thmx", tmp_path / "Missing.thmx")
+    Summary = RunBatch(Jobs, JournalPath)
+    assert (Summary.Built, Summary.Skipped, Summary.Failed) == (2, 1, 0)
+    AssertArchiveIsValid(Jobs[1].Output)
+
+    # A changed input invalidates the jobs that use it.
+    shutil.copy(SampleThemes / "Tema D.thmx", tmp_path / "Tema B.thmx")
+    Summary = RunBatch(Jobs, JournalPath)
+    assert (Summary.Built, Summary.Skipped, Summary.Failed) == (1, 2, 0)
+
+
+def test_DuplicateOutputsAreRejected(tmp_path: Path) -> None:
+    JobFilePath = tmp_path / "jobs.json"
+    JobFilePath.write_text(
+        json.dumps(
+            {
+                "jobs": [
+                    {"base": "A.thmx", "variants": ["B.thmx"], "output": "out/AB"},
+                    {"base": "A.thmx", "variants": ["C.thmx"], "output": "out/../out/AB.thmx"},
+                ]
+            }
+        ),
+        encoding="utf-8",
+    )
+    with pytest.raises(ValueError, match="same output"):
+        LoadBatchJobs(JobFilePath)
@@ -0,0 +1,31 @@
+# test_cli.py
+#
+# Argument validation of the command-line interface.
+
+
+from pathlib import Path
+
+import pytest
+
+from Scripts.cli import ParseArguments, ParseBatchArguments, ParseVerifyStoreArguments, RunSubcommand
+
+
+@pytest.mark.parametrize("ChunkSize", ["0", "-1", "abc"])
+@pytest.mark.parametrize("Command", ["batch", "verify-store"])
+def test_ChunkSizeMustBePositive(tmp_path: Path, Command: str, ChunkSize: str) -> None:
+    with pytest.raises(SystemExit) as ExitInfo:
+        RunSubcommand([Command, str(tmp_path / "target"), "--chunk-size", ChunkSize])
+    assert ExitInfo.value.code == 2
+
+
+def test_ChunkSizeIsParsed() -> None:
+    assert ParseBatchArguments(["jobs.json", "--chunk-size", "4096"]).ChunkSize == 4096
+    assert ParseVerifyStoreArguments(["store", "--chunk-size", "1"]).ChunkSize == 1
+
+
+def test_BuildChunkSizeMustBePositive(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("sys.argv", ["creador", "a.thmx", "b.thmx", "out.thmx", "--chunk-size", "0"])
+    with pytest.raises(SystemExit):
+        ParseArguments()
+    monkeypatch.setattr("sys.argv", ["creador", "a.thmx", "b.thmx", "out.thmx", "--chunk-size", "65536"])
+    assert ParseArguments().ChunkSize == 65536
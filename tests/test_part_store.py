@@ -0,0 +1,207 @@
+# test_part_store.py
+#
+# Builds through the shared part store, which writes stored deflate data into
+# the archive with zipfile internals (archive_manager._WriteStoredEntry), and
+# checks that every output round-trips, including damaged blobs and zip64.
+
+
+from pathlib import Path
+import struct
+import zipfile
+
+import pytest
+
+from conftest import AssertArchiveIsValid
+from Scripts import archive_manager
+from Scripts.archive_manager import CreateArchiveFromDirectory, ExtractArchive
+from Scripts.cli import RunSubcommand
+from Scripts.part_store import PartStore
+from Scripts.super_theme_builder import BuildSuperTheme
+
+ZIP64_EXTRA_ID = 0x0001
+
+
+def _ReadEntries(ArchivePath: Path) -> dict[str, bytes]:
+    with zipfile.ZipFile(ArchivePath, "r") as Archive:
+        return {EntryInfo.filename: Archive.read(EntryInfo) for EntryInfo in Archive.infolist()}
+
+
+def _BuildSampleTheme(SampleThemes: Path, OutputPath: Path, SharedStore: PartStore | None) -> Path:
+    return BuildSuperTheme(
+        SampleThemes / "Tema A.thmx",
+        [SampleThemes / "Tema B.thmx"],
+        OutputPath,
+        ["B"],
+        SharedStore=SharedStore,
+    )
+
+
+def _LocalHeaderExtraIds(ArchivePath: Path, EntryInfo: zipfile.ZipInfo) -> list[int]:
+    # Header ids of the extra fields in the local header of one entry.
+    with open(ArchivePath, "rb") as ArchiveStream:
+        ArchiveStream.seek(EntryInfo.header_offset)
+        Header = ArchiveStream.read(zipfile.sizeFileHeader)
+        NameLength, ExtraLength = struct.unpack("<HH", Header[26:30])
+        ArchiveStream.seek(NameLength, 1)
+        Extra = ArchiveStream.read(ExtraLength)
+    ExtraIds = []
+    while len(Extra) >= 4:
+        ExtraId, FieldLength = struct.unpack("<HH", Extra[:4])
+        ExtraIds.append(ExtraId)
+        Extra = Extra[4 + FieldLength:]
+    return ExtraIds
+
+
+def test_StoreBuildsMatchRegularBuild(tmp_path: Path, SampleThemes: Path) -> None:
+    SharedStore = PartStore(tmp_path / "store")
+    FirstOutput = _BuildSampleTheme(SampleThemes, tmp_path / "first.thmx", SharedStore)
+    SecondOutput = _BuildSampleTheme(SampleThemes, tmp_path / "second.thmx", PartStore(tmp_path / "store"))
+
+    for OutputPath in (FirstOutput, SecondOutput):
+        AssertArchiveIsValid(OutputPath)
+
+    # Both builds hold the same parts as a build without the store, apart from
+    # the identifiers regenerated on every build.
+    ExtractPath = tmp_path / "extracted"
+    ExtractArchive(FirstOutput, ExtractPath)
+    RegularOutput = CreateArchiveFromDirectory(ExtractPath, tmp_path / "regular.thmx")
+    StoredOutput = CreateArchiveFromDirectory(ExtractPath, tmp_path / "stored.thmx", SharedStore=PartStore(tmp_path / "store"))
+    assert _ReadEntries(StoredOutput) == _ReadEntries(RegularOutput) == _ReadEntries(FirstOutput)
+    assert set(_ReadEntries(SecondOutput)) == set(_ReadEntries(FirstOutput))
+    assert PartStore(tmp_path / "store").VerifyAll() == []
+
+
+def test_DamagedBlobIsNotCopiedIntoArchive(tmp_path: Path, SampleThemes: Path) -> None:
+    StoreDirectory = tmp_path / "store"
+    _BuildSampleTheme(SampleThemes, tmp_path / "first.thmx", PartStore(StoreDirectory))
+
+    # Flip one byte of the largest blob, keeping its size.
+    BlobPath = max((StoreDirectory / "blobs").rglob("*.deflate"), key=lambda PathItem: PathItem.stat().st_size)
+    BlobData = bytearray(BlobPath.read_bytes())
+    BlobData[len(BlobData) // 2] ^= 0xFF
+    BlobPath.write_bytes(bytes(BlobData))
+
+    SharedStore = PartStore(StoreDirectory)
+    OutputPath = _BuildSampleTheme(SampleThemes, tmp_path / "second.thmx", SharedStore)
+    AssertArchiveIsValid(OutputPath)
+    assert SharedStore.VerifyAll() == []
+
+    # The part was compressed again, so the next build reuses it normally.
+    AssertArchiveIsValid(_BuildSampleTheme(SampleThemes, tmp_path / "third.thmx", PartStore(StoreDirectory)))
+
+
+def test_StoredEntriesUseZip64WhenNeeded(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # Lower the zip64 threshold so small parts take the zip64 path.
+    SourceDirectory = tmp_path / "source"
+    (SourceDirectory / "media").mkdir(parents=True)
+    (SourceDirectory / "small.xml").write_bytes(b"<a/>")
+    (SourceDirectory / "media" / "large.bin").write_bytes(bytes(range(256)) * 64)
+    monkeypatch.setattr(zipfile, "ZIP64_LIMIT", 1024)
+
+    OutputPath = CreateArchiveFromDirectory(SourceDirectory, tmp_path / "out.thmx", ChunkSize=4096, SharedStore=PartStore(tmp_path / "store"))
+    AssertArchiveIsValid(OutputPath)
+    with zipfile.ZipFile(OutputPath, "r") as Archive:
+        EntryInfos = {EntryInfo.filename: EntryInfo for EntryInfo in Archive.infolist()}
+    assert ZIP64_EXTRA_ID in _LocalHeaderExtraIds(OutputPath, EntryInfos["media/large.bin"])
+    assert ZIP64_EXTRA_ID not in _LocalHeaderExtraIds(OutputPath, EntryInfos["small.xml"])
+    assert _ReadEntries(OutputPath)["media/large.bin"] == bytes(range(256)) * 64
+
+
+def test_SaveErrorDoesNotHideBuildError(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    SourceDirectory = tmp_path / "source"
+    SourceDirectory.mkdir()
+    (SourceDirectory / "part.xml").write_bytes(b"<a/>")
+    SharedStore = PartStore(tmp_path / "store")
+
+    def FailingReplace(*Arguments: object) -> None:
+        raise RuntimeError("replace failed")
+
+    def FailingSave() -> None:
+        raise OSError("save failed")
+
+    monkeypatch.setattr(archive_manager.os, "replace", FailingReplace)
+    monkeypatch.setattr(SharedStore, "Save", FailingSave)
+    with pytest.raises(RuntimeError, match="replace failed"):
+        CreateArchiveFromDirectory(SourceDirectory, tmp_path / "out.thmx", SharedStore=SharedStore)
+    assert not (tmp_path / ".out.thmx.partial").exists()
+
+
+def test_VerifyStoreCommandDropsDamagedParts(tmp_path: Path, SampleThemes: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    StoreDirectory = tmp_path / "store"
+    _BuildSampleTheme(SampleThemes, tmp_path / "out.thmx", PartStore(StoreDirectory))
+    PartCount = PartStore(StoreDirectory).PartCount()
+    assert RunSubcommand(["verify-store", str(StoreDirectory)]) == 0
+
+    BlobPath = next((StoreDirectory / "blobs").rglob("*.deflate"))
+    BlobPath.write_bytes(b"\x00" * BlobPath.stat().st_size)
+    assert RunSubcommand(["verify-store", str(StoreDirectory)]) == 1
+    assert PartStore(StoreDirectory).PartCount() == PartCount - 1
+    assert not BlobPath.exists()
+    assert RunSubcommand(["verify-store", str(tmp_path / "missing")]) == 1
+
+
+def _BlobBytesOnDisk(StoreDirectory: Path) -> int:
+    return sum(BlobPath.stat().st_size for BlobPath in (StoreDirectory / "blobs").rglob("*.deflate"))
+
+
+def test_UnindexedBlobsAreRemovedByTrim(tmp_path: Path, SampleThemes: Path) -> None:
+    StoreDirectory = tmp_path / "store"
+    _BuildSampleTheme(SampleThemes, tmp_path / "first.thmx", PartStore(StoreDirectory))
+    (StoreDirectory / "index.json").write_text("not json", encoding="utf-8")
+
+    # Every blob of the first build is now unindexed; a smaller limit must be
+    # met by the files on disk, not only by the index.
+    ExtractPath = ExtractArchive(SampleThemes / "Tema C.thmx", tmp_path / "extracted")
+    SharedStore = PartStore(StoreDirectory, MaxBytes=20000)
+    AssertArchiveIsValid(CreateArchiveFromDirectory(ExtractPath, tmp_path / "second.thmx", SharedStore=SharedStore))
+    assert _BlobBytesOnDisk(StoreDirectory) == SharedStore.TotalBytes() <= 20000
+    assert PartStore(StoreDirectory).TotalBytes() == SharedStore.TotalBytes()
+
+
+def test_StoresSharingADirectoryKeepEachOthersParts(tmp_path: Path) -> None:
+    StoreDirectory = tmp_path / "store"
+    for Name in ("a", "b"):
+        (tmp_path / Name).mkdir()
+        (tmp_path / Name / f"{Name}.xml").write_bytes(Name.encode() * 1000)
+    FirstStore = PartStore(StoreDirectory)
+    SecondStore = PartStore(StoreDirectory)
+    CreateArchiveFromDirectory(tmp_path / "a", tmp_path / "a.thmx", SharedStore=FirstStore)
+    CreateArchiveFromDirectory(tmp_path / "b", tmp_path / "b.thmx", SharedStore=SecondStore)
+
+    # The second Save merged the first store's part instead of deleting it.
+    ReopenedStore = PartStore(StoreDirectory)
+    assert ReopenedStore.PartCount() == 2
+    assert ReopenedStore.VerifyAll() == []
+    assert _BlobBytesOnDisk(StoreDirectory) == ReopenedStore.TotalBytes()
+
+
+def test_BlobDeletedBeforeUseFallsBackToSource(tmp_path: Path, SampleThemes: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    SharedStore = PartStore(tmp_path / "store")
+    OriginalPut = PartStore.Put
+
+    def PutThenDeleteBlob(Store: PartStore, SourcePath: Path, ChunkSize: int = 1024) -> object:
+        # Simulate another process trimming the blob right after Put.
+        Part = OriginalPut(Store, SourcePath, ChunkSize)
+        Store._BlobPath(Part.Digest).unlink()
+        return Part
+
+    monkeypatch.setattr(PartStore, "Put", PutThenDeleteBlob)
+    OutputPath = _BuildSampleTheme(SampleThemes, tmp_path / "out.thmx", SharedStore)
+    AssertArchiveIsValid(OutputPath)
+    assert SharedStore.PartCount() == 0
+
+
+def test_MissingZipfileInternalsBypassTheStore(tmp_path: Path, SampleThemes: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # Simulate an interpreter whose ZipFile lacks one of the internals.
+    monkeypatch.setattr(archive_manager, "_ZIPFILE_WRITER_INTERNALS", archive_manager._ZIPFILE_WRITER_INTERNALS + ("_missing",))
+    SharedStore = PartStore(tmp_path / "store")
+    OutputPath = _BuildSampleTheme(SampleThemes, tmp_path / "out.thmx", SharedStore)
+    AssertArchiveIsValid(OutputPath)
+    assert SharedStore.PartCount() == 0
+
+
+def test_ZipfileInternalsArePresent(tmp_path: Path) -> None:
+    # Fails on a Python version that changed them, instead of silently
+    # running every build without the store.
+    with zipfile.ZipFile(tmp_path / "probe.zip", "w") as Archive:
+        assert archive_manager._SupportsStoredEntries(Archive)
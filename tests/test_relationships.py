@@ -0,0 +1,92 @@
+# test_relationships.py
+#
+# Id allocation of RelationshipPart and the relationship ids written by a
+# super theme build.
+
+
+from pathlib import Path
+import zipfile
+
+from conftest import AssertArchiveIsValid
+from Scripts import xml_backend as XmlBackend
+from Scripts.relationships import (
+    OFFICE_DOCUMENT_RELATIONSHIP,
+    RELATIONSHIPS_NAMESPACE,
+    RelationshipPart,
+    WriteThemeVariantManagerRelationships,
+)
+from Scripts.super_theme_builder import BuildSuperTheme
+from Scripts.super_theme_inspector import InspectArchive
+from Scripts.theme_variant_manager import R_NAMESPACE, T_NAMESPACE
+
+
+def test_AllocateIdSkipsTakenIds() -> None:
+    Relationships = RelationshipPart()
+    assert Relationships.Add("type", "/a", PreferredId="rId2") == "rId2"
+    assert Relationships.AddMany("type", ["/b", "/c", "/d"]) == ["rId1", "rId3", "rId4"]
+    # The same (Type, Target) is not added twice.
+    assert Relationships.Add("type", "/c") == "rId3"
+    assert Relationships.Add("type", "/e", PreferredId="rId1") == "rId5"
+
+
+def test_AllocateIdRewindsAfterRemoval() -> None:
+    Relationships = RelationshipPart()
+    Relationships.AddMany("type", [f"/{Index}" for Index in range(6)])
+    assert Relationships.RemoveMany(["rId4", "rId2", "rId9"]) == 2
+    assert not Relationships.Exists("type", "/1")
+    assert Relationships.GetTarget("rId2") is None
+    assert Relationships.AddMany("type", ["/x", "/y", "/z"]) == ["rId2", "rId4", "rId7"]
+
+
+def test_LoadIndexesExistingIds(tmp_path: Path) -> None:
+    RelationshipsPath = tmp_path / ".rels"
+    RelationshipsPath.write_text(
+        f'<Relationships xmlns="{RELATIONSHIPS_NAMESPACE}">'
+        '<Relationship Id="rId1" Type="type" Target="/a"/><Relationship Id="custom" Type="type" Target="/b"/>'
+        "</Relationships>",
+        encoding="utf-8",
+    )
+    Relationships = RelationshipPart.Load(RelationshipsPath)
+    assert Relationships.FindId("type", "/b") == "custom"
+    assert Relationships.Add("type", "/c") == "rId2"
+    Relationships.Write(RelationshipsPath)
+    assert RelationshipPart.Load(RelationshipsPath).GetTarget("rId2") == "/c"
+
+
+def test_ManagerRelationshipsReturnAllocatedIds(tmp_path: Path) -> None:
+    RelationshipsPath = tmp_path / "_rels" / "themeVariantManager.xml.rels"
+    PrincipalId, VariantIds = WriteThemeVariantManagerRelationships(RelationshipsPath, ["B", "C"])
+    Relationships = RelationshipPart.Load(RelationshipsPath)
+    assert Relationships.GetTarget(PrincipalId) == "/theme/theme/themeManager.xml"
+    assert [Relationships.GetTarget(VariantId) for VariantId in VariantIds] == [
+        "/themeVariants/B/theme/theme/themeManager.xml",
+        "/themeVariants/C/theme/theme/themeManager.xml",
+    ]
+    assert Relationships.FindId(OFFICE_DOCUMENT_RELATIONSHIP, "/themeVariants/C/theme/theme/themeManager.xml") == VariantIds[1]
+
+
+def test_BuildLinksEveryVariantToItsOwnThemeManager(tmp_path: Path, SampleThemes: Path) -> None:
+    OutputPath = BuildSuperTheme(
+        SampleThemes / "Tema A.thmx",
+        [SampleThemes / "Tema B.thmx", SampleThemes / "Tema C.thmx", SampleThemes / "Tema D.thmx"],
+        tmp_path / "out.thmx",
+        ["B", "C", "D"],
+    )
+    AssertArchiveIsValid(OutputPath)
+
+    with zipfile.ZipFile(OutputPath, "r") as Archive:
+        ManagerRoot = XmlBackend.ParseBytes(Archive.read("themeVariants/themeVariantManager.xml"))
+        ManagerRelationships = RelationshipPart(XmlBackend.ParseBytes(Archive.read("themeVariants/_rels/themeVariantManager.xml.rels")))
+        PartNames = set(Archive.namelist())
+
+    for VariantElement in ManagerRoot.iter(f"{{{T_NAMESPACE}}}themeVariant"):
+        Name = VariantElement.get("name")
+        Target = ManagerRelationships.GetTarget(VariantElement.get(f"{{{R_NAMESPACE}}}id"))
+        ExpectedTarget = "/theme/theme/themeManager.xml" if Name == "Principal" else f"/themeVariants/{Name}/theme/theme/themeManager.xml"
+        assert Target == ExpectedTarget
+        assert Target.lstrip("/") in PartNames
+
+    Report = InspectArchive(OutputPath)
+    assert Report.Error is None
+    assert [Variant.Name for Variant in Report.Variants] == ["Principal", "B", "C", "D"]
+    assert all(Variant.ThemeFamilyVid == Variant.Vid for Variant in Report.Variants[1:])
@@ -0,0 +1,50 @@
+# test_super_theme_inspector.py
+#
+# Inspection of super theme archives, including damaged ones.
+
+
+from pathlib import Path
+import shutil
+import zipfile
+
+from Scripts.cli import RunSubcommand
+from Scripts.super_theme_inspector import CollectArchives, InspectArchive, InspectArchives
+
+MANAGER_PART = "themeVariants/themeVariantManager.xml"
+
+
+def _CorruptEntryData(ArchivePath: Path, PartName: str) -> None:
+    # Overwrite the compressed data of one entry with 0xFF bytes, keeping the
+    # archive structure (central directory, headers) intact.
+    with zipfile.ZipFile(ArchivePath, "r") as Archive:
+        EntryInfo = Archive.getinfo(PartName)
+    with open(ArchivePath, "r+b") as ArchiveStream:
+        ArchiveStream.seek(EntryInfo.header_offset + 26)
+        NameLength = int.from_bytes(ArchiveStream.read(2), "little")
+        ExtraLength = int.from_bytes(ArchiveStream.read(2), "little")
+        ArchiveStream.seek(EntryInfo.header_offset + zipfile.sizeFileHeader + NameLength + ExtraLength)
+        ArchiveStream.write(b"\xff" * EntryInfo.compress_size)
+
+
+def test_InspectSampleSuperTheme(SampleThemes: Path) -> None:
+    Report = InspectArchive(SampleThemes / "super_Tema A.thmx")
+    assert Report.Error is None
+    assert Report.HasVariantsRelationship
+    assert Report.Variants and Report.Variants[0].Name == "Principal"
+
+
+def test_DamagedArchivesAreReportedNotRaised(tmp_path: Path, SampleThemes: Path) -> None:
+    ArchivesDirectory = tmp_path / "themes"
+    ArchivesDirectory.mkdir()
+    shutil.copy(SampleThemes / "super_Tema A.thmx", ArchivesDirectory / "a_good.thmx")
+    CorruptArchive = shutil.copy(SampleThemes / "super_Tema A.thmx", ArchivesDirectory / "b_corrupt.thmx")
+    _CorruptEntryData(CorruptArchive, MANAGER_PART)
+    (ArchivesDirectory / "c_not_a_zip.thmx").write_bytes(b"not a zip file")
+
+    Reports = InspectArchives(CollectArchives([ArchivesDirectory]))
+    assert [Path(Report.ArchivePath).name for Report in Reports] == ["a_good.thmx", "b_corrupt.thmx", "c_not_a_zip.thmx"]
+    assert Reports[0].Error is None
+    assert Reports[1].Error is not None and Reports[1].Error.startswith("error:")
+    assert Reports[2].Error is not None and Reports[2].Error.startswith("BadZipFile:")
+
+    assert RunSubcommand(["inspect", str(ArchivesDirectory)]) == 1
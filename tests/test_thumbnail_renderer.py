@@ -0,0 +1,57 @@
+# test_thumbnail_renderer.py
+#
+# Recoloring of variant previews. The stage needs NumPy and Pillow, so the
+# tests are skipped when they are not installed.
+
+
+from pathlib import Path
+import json
+import zipfile
+
+import pytest
+
+numpy = pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+
+from Scripts.super_theme_builder import BuildSuperTheme
+from Scripts.thumbnail_renderer import ThumbnailJob, RecolorVariantThumbnails, _BuildColorMapping, _RecolorPixels
+from Scripts.variant_generator import LoadVariantTable
+
+
+def test_RecolorPixelsShiftsOnlyPixelsWithinTolerance() -> None:
+    SourceColors, ColorDeltas = _BuildColorMapping({"accent1": "FF0000", "accent2": "000080"}, {"accent1": "00FF00", "accent2": "0000FF"})
+    Pixels = numpy.array(
+        [[[250, 5, 5], [128, 128, 128]], [[0, 0, 120], [0, 0, 200]]],
+        dtype=numpy.uint8,
+    )
+    Recolored = _RecolorPixels(Pixels, SourceColors, ColorDeltas, Tolerance=20)
+
+    assert Recolored.dtype == numpy.uint8 and Recolored.shape == Pixels.shape
+    # Near FF0000: moved by (-255, +255, 0) and clipped to 0..255.
+    assert Recolored[0, 0].tolist() == [0, 255, 5]
+    # Far from every scheme color: untouched.
+    assert Recolored[0, 1].tolist() == [128, 128, 128]
+    assert Recolored[1, 1].tolist() == [0, 0, 200]
+    # Near 000080: moved by (0, 0, +127), keeping its offset.
+    assert Recolored[1, 0].tolist() == [0, 0, 247]
+
+
+def test_EmptyBasePaletteLeavesPreviewsUntouched(tmp_path: Path) -> None:
+    SourceColors, ColorDeltas = _BuildColorMapping({}, {"accent1": "00FF00"})
+    Pixels = numpy.zeros((2, 2, 3), dtype=numpy.uint8)
+    assert _RecolorPixels(Pixels, SourceColors, ColorDeltas, Tolerance=48).tolist() == Pixels.tolist()
+    assert RecolorVariantThumbnails([ThumbnailJob(tmp_path, {}, {"accent1": "00FF00"})]) == 0
+
+
+def test_BuildRecolorsGeneratedVariantThumbnails(tmp_path: Path, SampleThemes: Path) -> None:
+    TablePath = tmp_path / "table.json"
+    TablePath.write_text(json.dumps([{"name": "Azul", "hue_shift": 180}, {"name": "Same"}]), encoding="utf-8")
+    OutputPath = BuildSuperTheme(
+        SampleThemes / "Tema A.thmx", [], tmp_path / "out.thmx", GeneratedVariants=LoadVariantTable(TablePath), RegenerateThumbnails=True
+    )
+
+    with zipfile.ZipFile(OutputPath, "r") as Archive:
+        BaseThumbnail = Archive.read("theme/theme/themeThumbnail.jpeg")
+        assert Archive.read("themeVariants/Azul/theme/theme/themeThumbnail.jpeg") != BaseThumbnail
+        # A variant with the base palette keeps the original preview bytes.
+        assert Archive.read("themeVariants/Same/theme/theme/themeThumbnail.jpeg") == BaseThumbnail
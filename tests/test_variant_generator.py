@@ -0,0 +1,94 @@
+# test_variant_generator.py
+#
+# Builds super themes with variants generated from a palette table and checks
+# the resulting archives.
+
+
+from pathlib import Path
+import json
+import zipfile
+
+import pytest
+
+from conftest import AssertArchiveIsValid
+from Scripts.super_theme_builder import BuildSuperTheme
+from Scripts.super_theme_inspector import InspectArchive
+from Scripts.variant_generator import LoadVariantTable
+
+SYSTEM_DK1 = '<a:dk1><a:sysClr val="windowText" lastClr="000000"/></a:dk1>'
+
+
+def _WriteTable(TablePath: Path, Rows: list[dict]) -> Path:
+    TablePath.write_text(json.dumps({"variants": Rows}), encoding="utf-8")
+    return TablePath
+
+
+def _WithSystemDarkColor(SourceArchive: Path, OutputArchive: Path) -> Path:
+    # Copy a sample theme, replacing its dk1 slot with a system color.
+    with zipfile.ZipFile(SourceArchive, "r") as Source, zipfile.ZipFile(OutputArchive, "w", zipfile.ZIP_DEFLATED) as Output:
+        for EntryInfo in Source.infolist():
+            Data = Source.read(EntryInfo)
+            if EntryInfo.filename == "theme/theme/theme1.xml":
+                Text = Data.decode("utf-8")
+                Start = Text.index("<a:dk1>")
+                End = Text.index("</a:dk1>") + len("</a:dk1>")
+                Data = (Text[:Start] + SYSTEM_DK1 + Text[End:]).encode("utf-8")
+            Output.writestr(EntryInfo, Data)
+    return OutputArchive
+
+
+def test_GeneratedVariantsBuildValidArchive(tmp_path: Path, SampleThemes: Path) -> None:
+    TablePath = _WriteTable(
+        tmp_path / "table.json",
+        [
+            {"name": "Azul", "hue_shift": 180, "major_font": "Georgia", "colors": {"accent1": "#1f4e79"}},
+            {"name": "Rojo", "colors": {"accent2": "C00000"}},
+            {"name": "Same"},
+        ],
+    )
+    OutputPath = BuildSuperTheme(
+        SampleThemes / "Tema A.thmx",
+        [SampleThemes / "Tema B.thmx"],
+        tmp_path / "out.thmx",
+        ["B"],
+        GeneratedVariants=LoadVariantTable(TablePath),
+        RegenerateThumbnails=False,
+    )
+
+    AssertArchiveIsValid(OutputPath)
+    with zipfile.ZipFile(OutputPath, "r") as Archive:
+        PartNames = Archive.namelist()
+    assert PartNames.count("[Content_Types].xml") == 1
+    assert not [PartName for PartName in PartNames if PartName.startswith("themeVariants/") and PartName.endswith("[Content_Types].xml")]
+
+    Report = InspectArchive(OutputPath)
+    assert Report.Error is None
+    assert Report.HasVariantsRelationship
+    assert [Variant.Name for Variant in Report.Variants] == ["Principal", "B", "Azul", "Rojo", "Same"]
+    for Variant in Report.Variants[1:]:
+        assert Variant.ThemePart == f"themeVariants/{Variant.Name}/theme/theme/theme1.xml"
+        assert Variant.PartCount > 0
+
+
+def test_UnchangedSlotsKeepSystemColors(tmp_path: Path, SampleThemes: Path) -> None:
+    BaseArchive = _WithSystemDarkColor(SampleThemes / "Tema A.thmx", tmp_path / "base.thmx")
+    TablePath = _WriteTable(tmp_path / "table.json", [{"name": "Azul", "hue_shift": 180}])
+    OutputPath = BuildSuperTheme(
+        BaseArchive, [], tmp_path / "out.thmx", GeneratedVariants=LoadVariantTable(TablePath), RegenerateThumbnails=False
+    )
+
+    with zipfile.ZipFile(OutputPath, "r") as Archive:
+        BaseTheme = Archive.read("theme/theme/theme1.xml").decode("utf-8")
+        VariantTheme = Archive.read("themeVariants/Azul/theme/theme/theme1.xml").decode("utf-8")
+    assert 'sysClr val="windowText"' in BaseTheme
+    assert 'sysClr val="windowText"' in VariantTheme
+    # The hue shift itself is still applied to the accent colors.
+    assert '<a:srgbClr val="2FAEB8"' in BaseTheme
+    assert '<a:srgbClr val="2FAEB8"' not in VariantTheme
+
+
+@pytest.mark.parametrize("VariantName", ["../x", "a/b", "a\\b", "..", " "])
+def test_UnsafeVariantNamesAreRejected(tmp_path: Path, VariantName: str) -> None:
+    TablePath = _WriteTable(tmp_path / "table.json", [{"name": VariantName}])
+    with pytest.raises(ValueError):
+        LoadVariantTable(TablePath)
@@ -0,0 +1,66 @@
+# test_xml_backend.py
+#
+# The same build must give equivalent parts with the same namespace prefixes
+# on the lxml and the ElementTree backend (see xml_backend.py).
+
+
+from pathlib import Path
+import json
+
+import pytest
+
+from conftest import AssertArchiveIsValid
+from Scripts import xml_backend as XmlBackend
+from Scripts.archive_manager import ExtractArchive
+from Scripts.super_theme_builder import BuildSuperTheme
+from Scripts.variant_generator import LoadVariantTable
+from Scripts.xml_benchmark import _Normalize
+
+pytest.importorskip("lxml")
+
+
+@pytest.fixture
+def RestoreBackend():
+    OriginalBackend = XmlBackend.GetBackend()
+    yield
+    XmlBackend.SetBackend(OriginalBackend)
+
+
+def _BuildWithBackend(BackendName: str, SampleThemes: Path, WorkDirectory: Path, TablePath: Path) -> dict[str, tuple[str, list[str]]]:
+    # Build on one backend and return the normalized form of every XML part.
+    XmlBackend.SetBackend(BackendName)
+    OutputPath = BuildSuperTheme(
+        SampleThemes / "Tema A.thmx",
+        [SampleThemes / "Tema B.thmx", SampleThemes / "Tema C.thmx"],
+        WorkDirectory / "out.thmx",
+        ["B", "C"],
+        GeneratedVariants=LoadVariantTable(TablePath),
+        RegenerateThumbnails=False,
+    )
+    AssertArchiveIsValid(OutputPath)
+    ExtractPath = ExtractArchive(OutputPath, WorkDirectory / "extracted")
+    return {
+        PathItem.relative_to(ExtractPath).as_posix(): _Normalize(PathItem)
+        for PathItem in sorted(ExtractPath.rglob("*"))
+        if PathItem.name.endswith((".xml", ".rels"))
+    }
+
+
+def test_BackendsGiveEquivalentBuilds(tmp_path: Path, SampleThemes: Path, RestoreBackend: None) -> None:
+    TablePath = tmp_path / "table.json"
+    TablePath.write_text(json.dumps([{"name": "Azul", "hue_shift": 180, "major_font": "Georgia"}]), encoding="utf-8")
+
+    # stdlib runs twice, before and after lxml, so the ElementTree prefix
+    # cache is exercised both from a fresh state and after other part types.
+    Results = {}
+    for RunName, BackendName in (("stdlib-first", XmlBackend.BACKEND_STDLIB), ("lxml", XmlBackend.BACKEND_LXML), ("stdlib-again", XmlBackend.BACKEND_STDLIB)):
+        WorkDirectory = tmp_path / RunName
+        WorkDirectory.mkdir()
+        Results[RunName] = _BuildWithBackend(BackendName, SampleThemes, WorkDirectory, TablePath)
+
+    PartNames = set(Results["lxml"])
+    assert {"[Content_Types].xml", "_rels/.rels", "themeVariants/themeVariantManager.xml", "theme/theme/theme1.xml"} <= PartNames
+    for RunName in ("stdlib-first", "stdlib-again"):
+        assert set(Results[RunName]) == PartNames
+        for PartName in sorted(PartNames):
+            assert Results[RunName][PartName] == Results["lxml"][PartName], f"{PartName} differs on {RunName}"